@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Organizador de Descargas - Banco de Pruebas de Rendimiento
+Mide archivos/s y la latencia evento → movimiento sobre una carpeta sintética.
+
+Escenarios:
+  sweep    organizar una carpeta ya llena (organize_existing_files)
+  burst    llegada de muchos archivos a la vez con el monitoreo activo
+  trickle  llegada constante de archivos a un ritmo fijo
+
+Uso:
+  python3 benchmark_organizer.py --files 2000 --output resultados.json
+  python3 benchmark_organizer.py --scenarios burst,trickle --watcher polling
+"""
+
+import os
+import sys
+import time
+import json
+import math
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+import download_organizer
+from download_organizer import (DownloadOrganizer, OrganizerPipeline, DownloadEventHandler,
+                                FallbackMonitor, WATCHDOG_AVAILABLE)
+
+# Mezcla de extensiones por defecto: (extensión, peso). "" = sin extensión
+EXTENSION_MIX = [
+    ('.jpg', 20), ('.png', 10), ('.pdf', 15), ('.docx', 8), ('.zip', 8),
+    ('.mp4', 5), ('.mp3', 5), ('.txt', 5), ('.exe', 3), ('.tar.gz', 3),
+    ('.py', 3), ('', 3), ('.xyz', 2),
+]
+
+# Configuración base de las mediciones: sin notificaciones ni una línea de log por archivo
+BENCHMARK_CONFIG = {
+    "show_notifications": False,
+    "log_level": "WARNING",
+    "file_log_level": "DEBUG",
+}
+
+SCENARIOS = ("sweep", "burst", "trickle")
+
+
+def parse_extensions(text):
+    """Mezcla de extensiones de la línea de órdenes: ".pdf:15,.jpg:20,:3" -> [(".pdf", 15), ...]"""
+    mix = []
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        ext, sep, weight = item.strip().rpartition(":")
+        try:
+            weight = float(weight) if sep else None
+        except ValueError:
+            weight = None
+        if weight is None or weight <= 0:
+            raise argparse.ArgumentTypeError(f"se esperaba extensión:peso, no {item.strip()!r}")
+        ext = ext.strip().lower()
+        if ext and not ext.startswith("."):
+            ext = "." + ext
+        mix.append((ext, weight))
+    if not mix:
+        raise argparse.ArgumentTypeError("la mezcla de extensiones está vacía")
+    return mix
+
+
+class SyntheticTree:
+    """Generador reproducible de descargas sintéticas.
+
+    Los tamaños siguen una distribución log-normal alrededor de `median_size`, y
+    una fracción `collisions` de los archivos reutiliza un nombre que ya existe
+    en su carpeta de destino, para medir también la resolución de nombres.
+    """
+
+    def __init__(self, seed=1, min_size=1024, max_size=8 * 1024 * 1024, median_size=64 * 1024,
+                 collisions=0.1, extensions=None):
+        self.rng = random.Random(seed)
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.median_size = median_size
+        self.collisions = collisions
+        self.extensions = extensions or EXTENSION_MIX
+        # Un único bloque aleatorio del que se cortan los contenidos
+        self.payload = self.rng.randbytes(self.max_size)
+
+    def size(self):
+        size = int(self.rng.lognormvariate(math.log(self.median_size), 1.5))
+        return min(max(size, self.min_size), self.max_size)
+
+    def plan(self, count):
+        """Lista de (nombre, tamaño) a descargar y nombres que ya existen en el destino"""
+        exts, weights = zip(*self.extensions)
+        files = []
+        existing = []
+        for i in range(count):
+            ext = self.rng.choices(exts, weights)[0]
+            name = f"descarga_{i:06d}{ext}"
+            if self.rng.random() < self.collisions:
+                existing.append(name)
+            files.append((name, self.size()))
+        return files, existing
+
+    def write(self, path, size, mode="rename"):
+        """Escribir un archivo; en modo "rename" como un navegador (.part y renombrado)"""
+        target = path.with_name(path.name + ".part") if mode == "rename" else path
+        with open(target, 'wb') as f:
+            f.write(self.payload[:size])
+        if mode == "rename":
+            os.replace(target, path)
+
+
+class BenchmarkOrganizer(DownloadOrganizer):
+    """Organizador que anota el instante en que se mueve cada archivo"""
+
+    def __init__(self, downloads_dir):
+        self.moved_at = {}
+        super().__init__(downloads_dir)
+
+    def record_move(self, category, source, destination, size, linked=False):
+        self.moved_at[Path(source).name] = time.perf_counter()
+        super().record_move(category, source, destination, size, linked)
+
+
+class Workspace:
+    """Carpeta temporal con su propia configuración; el proceso trabaja dentro de ella"""
+
+    def __init__(self, config_overrides=None, keep=False):
+        self.keep = keep
+        self.config = dict(BENCHMARK_CONFIG)
+        self.config.update(config_overrides or {})
+
+    def __enter__(self):
+        self.previous_cwd = os.getcwd()
+        self.root = Path(tempfile.mkdtemp(prefix="organizer-bench-"))
+        self.downloads = self.root / "Downloads"
+        self.downloads.mkdir()
+        with open(self.root / "organizer_config.json", 'w', encoding='utf-8') as f:
+            json.dump(self.config, f, indent=2)
+        os.chdir(self.root)
+        return self
+
+    def __exit__(self, *exc):
+        os.chdir(self.previous_cwd)
+        if self.keep:
+            print(f"📁 Carpeta conservada: {self.root}", file=sys.stderr)
+        else:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def prepare(organizer, tree, existing):
+    """Crear en sus carpetas de destino los archivos con los que chocarán los nombres"""
+    for name in existing:
+        category_dir = organizer.downloads_dir / organizer.get_category(Path(name), 0)
+        category_dir.mkdir(parents=True, exist_ok=True)
+        tree.write(category_dir / name, tree.min_size, mode="direct")
+
+
+def start_watcher(organizer, pipeline, kind):
+    """Arrancar el monitoreo pedido; devuelve (nombre, función para detenerlo)"""
+    handler = DownloadEventHandler(organizer, pipeline)
+    if kind == "auto":
+        kind = "watchdog" if WATCHDOG_AVAILABLE else "inotify"
+    if kind == "watchdog":
+        from watchdog.observers import Observer
+        observer = Observer()
+        observer.schedule(handler, str(organizer.downloads_dir), recursive=False)
+        observer.start()
+
+        def stop():
+            observer.stop()
+            observer.join()
+        return kind, stop
+
+    fallback = FallbackMonitor(organizer, handler, use_inotify=(kind == "inotify"))
+    return fallback.start(), fallback.stop
+
+
+def run_sweep(args):
+    """Organizar de una vez una carpeta con `args.files` archivos"""
+    tree = SyntheticTree(args.seed, args.min_size, args.max_size, args.median_size, args.collisions,
+                         args.extensions)
+    files, existing = tree.plan(args.files)
+
+    with Workspace(args.config, args.keep) as ws:
+        for name, size in files:
+            tree.write(ws.downloads / name, size, mode="direct")
+        organizer = BenchmarkOrganizer(ws.downloads)
+        prepare(organizer, tree, existing)
+
+        start = time.perf_counter()
+        organized = organizer.organize_existing_files()
+        elapsed = time.perf_counter() - start
+        organizer.shutdown()
+
+    return {
+        "files": len(files),
+        "organized": organized,
+        "collisions": len(existing),
+        "bytes": sum(size for _, size in files),
+        "bulk": organizer.config.get("bulk_sweep", True),
+        "seconds": round(elapsed, 4),
+        "files_per_sec": round(organized / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def run_live(args, scenario):
+    """Escribir archivos con el monitoreo activo y medir cuánto tarda cada uno en moverse"""
+    tree = SyntheticTree(args.seed, args.min_size, args.max_size, args.median_size, args.collisions,
+                         args.extensions)
+    count = args.files if scenario == "burst" else max(1, int(args.rate * args.duration))
+    files, existing = tree.plan(count)
+
+    with Workspace(args.config, args.keep) as ws:
+        organizer = BenchmarkOrganizer(ws.downloads)
+        prepare(organizer, tree, existing)
+        pipeline = OrganizerPipeline(organizer)
+        pipeline.start()
+        watcher, stop_watcher = start_watcher(organizer, pipeline, args.watcher)
+        time.sleep(0.2)  # Dejar que el observador termine de arrancar
+
+        arrived_at = {}
+        start = time.perf_counter()
+        for i, (name, size) in enumerate(files):
+            if scenario == "trickle":
+                delay = start + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            tree.write(ws.downloads / name, size, mode=args.write_mode)
+            arrived_at[name] = time.perf_counter()
+        writing = time.perf_counter() - start
+
+        # Esperar a que se muevan todos o a que venza el plazo
+        deadline = time.perf_counter() + args.timeout
+        while len(organizer.moved_at) < len(files) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+        stop_watcher()
+        pipeline.stop()
+        organizer.shutdown()
+
+    latencies = [organizer.moved_at[name] - arrived_at[name]
+                 for name in arrived_at if name in organizer.moved_at]
+    moved = len(latencies)
+    span = (max(organizer.moved_at.values()) - min(arrived_at.values())) if moved else 0
+    return {
+        "files": len(files),
+        "moved": moved,
+        "missing": len(files) - moved,
+        "collisions": len(existing),
+        "watcher": watcher,
+        "write_mode": args.write_mode,
+        "rate": args.rate if scenario == "trickle" else None,
+        "write_seconds": round(writing, 4),
+        "seconds": round(span, 4),
+        "files_per_sec": round(moved / span, 1) if span > 0 else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p90": round(percentile(latencies, 90) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            "max": round(max(latencies) * 1000, 2) if latencies else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas del Organizador de Descargas")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="escenarios separados por comas (sweep, burst, trickle)")
+    parser.add_argument("--files", type=int, default=1000,
+                        help="archivos de los escenarios sweep y burst")
+    parser.add_argument("--rate", type=float, default=50, help="archivos/s del escenario trickle")
+    parser.add_argument("--duration", type=float, default=10, help="segundos del escenario trickle")
+    parser.add_argument("--min-size", type=int, default=1024)
+    parser.add_argument("--median-size", type=int, default=64 * 1024)
+    parser.add_argument("--max-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--collisions", type=float, default=0.1,
+                        help="fracción de archivos cuyo nombre ya existe en el destino")
+    parser.add_argument("--extensions", type=parse_extensions, default=None,
+                        help='mezcla de extensiones con su peso, p. ej. ".pdf:15,.jpg:20,:3" ("" = sin extensión)')
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--watcher", choices=("auto", "watchdog", "inotify", "polling"), default="auto")
+    parser.add_argument("--write-mode", choices=("rename", "direct"), default="rename",
+                        help="rename: .part y renombrado como un navegador; direct: escritura en sitio")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="segundos máximos de espera a que se muevan los archivos")
+    parser.add_argument("--config", type=json.loads, default=None,
+                        help='opciones de organizer_config.json a sobrescribir, p. ej. \'{"bulk_sweep": false}\'')
+    parser.add_argument("--output", help="archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--keep", action="store_true", help="no borrar las carpetas temporales")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"escenario desconocido: {name}")
+
+    results = {}
+    for name in scenarios:
+        print(f"⏱️  Escenario {name}...", file=sys.stderr)
+        results[name] = run_sweep(args) if name == "sweep" else run_live(args, name)
+
+    report = {
+        "benchmark": "download_organizer",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "module": os.path.abspath(download_organizer.__file__),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"✅ Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ import logging
 from pathlib import Path
 from datetime import datetime
 
+from download_organizer import NameIndex, SensitiveFilePolicy
+
 class DemoOrganizer:
     def __init__(self):
         self.downloads_dir = Path.home() / "Downloads"
@@ -60,6 +62,10 @@ class DemoOrganizer:
             "by_category": {},
             "start_date": datetime.now().isoformat()
         }
+        self.name_index = NameIndex()
+        # La demo usa la lista amplia y busca fragmentos del nombre (más agresivo que el servicio)
+        self.sensitive_policy = SensitiveFilePolicy(self.forbidden_files, self.forbidden_extensions,
+                                                    whole_words=False)
         
         # Configurar logging
         logging.basicConfig(
@@ -74,31 +80,7 @@ class DemoOrganizer:
         
     def is_sensitive_file(self, file_path):
         """Verificar si un archivo es sensible y no debe organizarse"""
-        filename = file_path.name.lower()
-        extension = file_path.suffix.lower()
-        
-        # Verificar extensión prohibida
-        if extension in self.forbidden_extensions:
-            return True
-        
-        # Verificar nombre de archivo con palabras prohibidas
-        for forbidden in self.forbidden_files:
-            if forbidden in filename:
-                return True
-        
-        # Verificar archivos CSV que puedan contener contraseñas
-        if extension == '.csv':
-            sensitive_keywords = ['password', 'contraseña', 'login', 'credential', 'secret']
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    first_lines = ''.join(f.readlines()[:5])  # Leer primeras 5 líneas
-                    for keyword in sensitive_keywords:
-                        if keyword in first_lines.lower():
-                            return True
-            except:
-                pass  # Si no puede leer el archivo, asumir que es sensible
-        
-        return False
+        return self.sensitive_policy.is_sensitive(file_path) is not None
     
     def get_category(self, file_path):
         ext = file_path.suffix.lower()
@@ -127,17 +109,8 @@ class DemoOrganizer:
             # Crear carpeta si no existe
             category_dir.mkdir(exist_ok=True)
             
-            # Generar nombre único si ya existe
-            dest_path = category_dir / file_path.name
-            counter = 1
-            while dest_path.exists():
-                stem = file_path.stem
-                suffix = file_path.suffix
-                dest_path = category_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
-            
-            # Mover archivo
-            shutil.move(str(file_path), str(dest_path))
+            # Mover archivo con un nombre único
+            dest_path = self.name_index.move(file_path, category_dir)
             
             # Actualizar estadísticas
             self.stats["total_organized"] += 1
@@ -8,259 +8,2986 @@ Compatible con Arch Linux y Windows.
 import os
 import sys
 import time
+
+START_TIME = time.perf_counter()  # Para medir el tiempo de arranque
+
 import shutil
 import json
 import logging
+import logging.handlers
+import itertools
+import re
+import fnmatch
+import mimetypes
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import platform
 import threading
-import tkinter as tk
-from tkinter import ttk, messagebox
-
-# Intentar importar dependencias opcionales
-try:
-    from watchdog.observers import Observer
-    from watchdog.events import FileSystemEventHandler
-    WATCHDOG_AVAILABLE = True
-except ImportError:
-    WATCHDOG_AVAILABLE = False
+import argparse
+import signal
+import subprocess
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import heapq
+import bisect
+import atexit
+import tempfile
+import select
+import struct
+import hashlib
+import ctypes
+import ctypes.util
+from types import SimpleNamespace
+import importlib.util
+# Dependencias opcionales: aquí solo se comprueba que existen; se importan al usarlas
+WATCHDOG_AVAILABLE = importlib.util.find_spec("watchdog") is not None
+if not WATCHDOG_AVAILABLE:
     print("⚠️  Watchdog no instalado. El monitoreo en tiempo real no estará disponible.")
 
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
+PSUTIL_AVAILABLE = importlib.util.find_spec("psutil") is not None
+if not PSUTIL_AVAILABLE:
     print("⚠️  Psutil no instalado. Las estadísticas del sistema no estarán disponibles.")
 
-class DownloadOrganizer:
+# tkinter solo se carga al abrir la ventana (nunca en modo --headless)
+tk = ttk = messagebox = None
+
+
+def load_tkinter():
+    """Importar tkinter bajo demanda"""
+    global tk, ttk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tkinter_ttk, messagebox as tkinter_messagebox
+        tk, ttk, messagebox = tkinter, tkinter_ttk, tkinter_messagebox
+    return tk
+
+
+class StageTimer:
+    """Cronómetro de una etapa (`with metrics.timer("etapa"):`)"""
+    
+    __slots__ = ("metrics", "stage", "start")
+    
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Métricas internas: histogramas de tiempo por etapa, contadores e indicadores.
+    
+    Registrar una muestra cuesta una lectura del reloj monotónico y una suma bajo
+    un lock, así que se puede dejar activo en el camino caliente. render() produce
+    el formato de texto de Prometheus.
+    """
+    
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+    PREFIX = "organizer_"
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # etapa -> {"buckets": [...], "sum": s, "count": n}
+        self.counters = {}    # nombre -> valor
+        self.gauges = {}      # (nombre, etiquetas) -> (tipo, ayuda, función sin argumentos)
+    
+    def timer(self, stage):
+        return StageTimer(self, stage)
+    
+    def observe(self, stage, seconds):
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {
+                    "buckets": [0] * (len(self.BUCKETS) + 1), "sum": 0.0, "count": 0}
+            histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+    
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def gauge(self, name, help_text, func, kind="gauge", labels=None):
+        """Registrar un valor que se lee al exportar (p. ej. la profundidad de una cola)"""
+        label_text = ",".join(f'{key}="{value}"' for key, value in sorted((labels or {}).items()))
+        with self.lock:
+            self.gauges[(name, label_text)] = (kind, help_text, func)
+    
+    def summary(self):
+        """Resumen por etapa para la interfaz: llamadas, media y p99 aproximado (ms)"""
+        with self.lock:
+            histograms = {stage: (list(h["buckets"]), h["sum"], h["count"])
+                          for stage, h in self.histograms.items()}
+            counters = dict(self.counters)
+        stages = {}
+        for stage, (buckets, total, count) in histograms.items():
+            stages[stage] = {
+                "count": count,
+                "mean_ms": total / count * 1000 if count else 0.0,
+                "p99_ms": self._quantile(buckets, count, 0.99) * 1000
+            }
+        return {"stages": stages, "counters": counters}
+    
+    def _quantile(self, buckets, count, q):
+        """Límite superior del cubo que contiene el cuantil q"""
+        target = q * count
+        cumulative = 0
+        for index, value in enumerate(buckets):
+            cumulative += value
+            if cumulative >= target and value:
+                return self.BUCKETS[index] if index < len(self.BUCKETS) else float("inf")
+        return 0.0
+    
+    def render(self):
+        """Exportar en formato de texto de Prometheus"""
+        with self.lock:
+            histograms = {stage: (list(h["buckets"]), h["sum"], h["count"])
+                          for stage, h in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        
+        name = f"{self.PREFIX}stage_seconds"
+        lines = [f"# HELP {name} Tiempo por etapa al organizar archivos",
+                 f"# TYPE {name} histogram"]
+        for stage, (buckets, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, value in zip(self.BUCKETS + ("+Inf",), buckets):
+                cumulative += value
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        
+        for counter, value in sorted(counters.items()):
+            lines.append(f"# TYPE {self.PREFIX}{counter}_total counter")
+            lines.append(f"{self.PREFIX}{counter}_total {value}")
+        
+        previous = None
+        for (gauge, label_text), (kind, help_text, func) in sorted(gauges.items()):
+            try:
+                value = func()
+            except Exception:
+                continue
+            if gauge != previous:
+                lines.append(f"# HELP {self.PREFIX}{gauge} {help_text}")
+                lines.append(f"# TYPE {self.PREFIX}{gauge} {kind}")
+                previous = gauge
+            labels = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.PREFIX}{gauge}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Servidor HTTP local que publica las métricas en /metrics"""
+    
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.server = None
+    
+    def start(self):
+        # Solo se importa si se activa el endpoint, para no retrasar el arranque
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # Sin una línea de log por cada consulta
+        
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        return self.port
+    
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class SamplingProfiler:
+    """Perfilador por muestreo de todos los hilos del proceso.
+    
+    Cada `interval` segundos toma las pilas de todos los hilos con
+    sys._current_frames() y cuenta las repeticiones; cada `snapshot_interval`
+    segundos escribe lo acumulado en formato "collapsed" (una pila por línea,
+    marcos separados por ';' y el número de muestras), el que usan flamegraph.pl
+    y speedscope. No instrumenta el código, así que se puede dejar activo.
+    """
+    
+    def __init__(self, output_dir="profiles", interval=0.01, snapshot_interval=60, logger=None):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.counts = {}         # pila (tupla de marcos) -> muestras
+        self.labels = {}         # objeto de código -> nombre del marco
+        self.thread_names = {}   # ident -> nombre del hilo
+        self.last_stacks = {}    # ident -> (marco superior, pila) de la muestra anterior
+        self.samples = 0
+        self.snapshots = 0
+        self.sample_time = 0.0   # segundos gastados muestreando desde la última instantánea
+        self.window_start = time.monotonic()
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    @classmethod
+    def from_config(cls, config, logger=None):
+        return cls(config.get("profile_dir", "profiles"),
+                   config.get("profile_interval", 0.01),
+                   config.get("profile_snapshot_interval", 60), logger)
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        if self.running:
+            return
+        self.stop_event = threading.Event()
+        self.window_start = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        self.logger.info("Perfilador activado (cada %.0f ms, instantáneas en %s)",
+                         self.interval * 1000, self.output_dir)
+    
+    def stop(self, wait=True):
+        """Detener el muestreo; el hilo escribe una última instantánea antes de salir"""
+        self.stop_event.set()
+        if wait and self.thread is not None:
+            self.thread.join()
+    
+    def toggle(self):
+        """Activar o desactivar (pensado para un manejador de señal: nunca bloquea)"""
+        if self.running and not self.stop_event.is_set():
+            self.stop(wait=False)
+            self.logger.info("Perfilador desactivado")
+        else:
+            self.start()
+    
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            label = self.labels[code] = (
+                f"{code.co_name}({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        return label
+    
+    def sample(self):
+        """Tomar una muestra de la pila de cada hilo (salvo el propio)"""
+        own = threading.get_ident()
+        frames = sys._current_frames()
+        last = {}
+        for ident, top in frames.items():
+            if ident == own:
+                continue
+            # Un hilo parado en el mismo marco que en la muestra anterior tiene la misma
+            # pila (los marcos vivos no cambian de padre): no hace falta recorrerla
+            cached = self.last_stacks.get(ident)
+            if cached is not None and cached[0] is top:
+                key = cached[1]
+            else:
+                stack = []
+                frame = top
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                name = self.thread_names.get(ident)
+                if name is None:
+                    self.thread_names = {t.ident: t.name for t in threading.enumerate()}
+                    name = self.thread_names.get(ident, f"thread-{ident}")
+                stack.append(name)
+                key = tuple(reversed(stack))
+            last[ident] = (top, key)
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.last_stacks = last
+        self.samples += 1
+    
+    def write_snapshot(self):
+        """Escribir las pilas acumuladas desde la última instantánea y empezar de cero"""
+        counts, self.counts = self.counts, {}
+        elapsed = time.monotonic() - self.window_start
+        overhead = self.sample_time / elapsed * 100 if elapsed > 0 else 0
+        samples, self.samples, self.sample_time = self.samples, 0, 0.0
+        self.window_start = time.monotonic()
+        if not counts:
+            return None
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots += 1
+        path = self.output_dir / (f"profile-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+                                  f"-{self.snapshots:04d}.collapsed")
+        write_file_atomic(path, "".join(f"{';'.join(stack)} {count}\n"
+                                        for stack, count in sorted(counts.items())))
+        self.logger.info("Perfil guardado en %s (%d muestras, sobrecarga %.2f%%)",
+                         path, samples, overhead)
+        return path
+    
+    def _run(self):
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        try:
+            while not self.stop_event.wait(self.interval):
+                start = time.perf_counter()
+                self.sample()
+                self.sample_time += time.perf_counter() - start
+                if time.monotonic() >= next_snapshot:
+                    self.write_snapshot()
+                    next_snapshot = time.monotonic() + self.snapshot_interval
+        except Exception as e:
+            self.logger.error("Error en el perfilador: %s", e)
+        finally:
+            self.last_stacks = {}  # No retener marcos (ni sus variables) mientras está parado
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                self.logger.error("No se pudo guardar el perfil: %s", e)
+
+
+def write_file_atomic(path, data):
+    """Escribir un archivo de texto de forma atómica (temporal + renombrado)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def format_size(size_mb):
+    """Texto legible para un tamaño en MB"""
+    if size_mb > 1024:
+        return f"{size_mb/1024:.2f} GB"
+    return f"{size_mb} MB"
+
+
+class DirectoryScanner:
+    """Motor de recorrido de carpetas basado en os.scandir.
+    
+    Cada subcarpeta se procesa como una tarea independiente en un pool de hilos,
+    los enlaces duros se cuentan una sola vez y el recorrido admite cancelación y
+    un presupuesto de tiempo (el resultado se marca entonces como incompleto).
+    """
+    
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+    
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                   thread_name_prefix="scanner")
+            return self.executor
+    
+    def shutdown(self):
+        """Liberar los hilos del pool"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+    
+    def scan(self, root, cancel=None, time_budget=None):
+        """Recorrer `root` y devolver archivos, bytes, mtimes de carpetas y si terminó.
+        
+        Lanza OSError si `root` no existe.
+        """
+        root = Path(root)
+        state = {
+            'file_count': 0,
+            'size_bytes': 0,
+            'dir_mtimes': {root: root.stat().st_mtime_ns},
+            'complete': True,
+            'seen_inodes': set(),
+            'pending': 1,
+            'cancel': cancel,
+            'deadline': time.monotonic() + time_budget if time_budget else None,
+            'lock': threading.Lock(),
+            'done': threading.Event()
+        }
+        executor = self._get_executor()
+        executor.submit(self._scan_dir, executor, state, root)
+        state['done'].wait()
+        return {key: state[key] for key in ('file_count', 'size_bytes', 'dir_mtimes', 'complete')}
+    
+    def _stopped(self, state):
+        if state['cancel'] is not None and state['cancel'].is_set():
+            return True
+        return state['deadline'] is not None and time.monotonic() > state['deadline']
+    
+    def _scan_dir(self, executor, state, folder):
+        subdirs = []
+        try:
+            if self._stopped(state):
+                with state['lock']:
+                    state['complete'] = False
+                return
+            
+            file_count = 0
+            size_bytes = 0
+            dir_mtimes = {}
+            linked = []
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        # is_dir/is_file usan el tipo que devuelve scandir sin syscalls extra
+                        if entry.is_dir(follow_symlinks=False):
+                            path = Path(entry.path)
+                            dir_mtimes[path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                            subdirs.append(path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_nlink > 1:
+                                linked.append((st.st_dev, st.st_ino, st.st_size))
+                                continue
+                            file_count += 1
+                            size_bytes += st.st_size
+                    except OSError:
+                        continue
+            
+            with state['lock']:
+                # Un archivo con varios enlaces duros solo cuenta la primera vez
+                for dev, ino, size in linked:
+                    if (dev, ino) not in state['seen_inodes']:
+                        state['seen_inodes'].add((dev, ino))
+                        file_count += 1
+                        size_bytes += size
+                state['file_count'] += file_count
+                state['size_bytes'] += size_bytes
+                state['dir_mtimes'].update(dir_mtimes)
+                state['pending'] += len(subdirs)
+        except OSError:
+            subdirs = []
+        finally:
+            with state['lock']:
+                state['pending'] -= 1
+                if state['pending'] == 0:
+                    state['done'].set()
+        
+        for i, subdir in enumerate(subdirs):
+            try:
+                executor.submit(self._scan_dir, executor, state, subdir)
+            except RuntimeError:
+                # Pool cerrado durante el apagado: dar por terminadas las que faltan
+                with state['lock']:
+                    state['complete'] = False
+                    state['pending'] -= len(subdirs) - i
+                    if state['pending'] == 0:
+                        state['done'].set()
+                break
+
+
+class MoveJournal:
+    """Diario de solo anexado con un movimiento por línea en formato JSON"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+    
+    def inode(self):
+        """Identificador del archivo actual, para detectar rotaciones"""
+        return os.fstat(self.file.fileno()).st_ino
+    
+    def append(self, payload):
+        """Añadir líneas ya codificadas al final del diario"""
+        self.file.write(payload)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.size += len(payload)
+    
+    def read_from(self, offset):
+        """Leer los registros escritos a partir de `offset`"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # Una última línea sin salto es una escritura interrumpida
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    
+    def rotate(self):
+        """Archivar el diario actual y empezar uno vacío"""
+        self.file.close()
+        os.replace(self.path, self.path + ".1")
+        self.file = open(self.path, 'ab')
+        self.size = 0
+    
+    def close(self):
+        self.file.close()
+
+
+class NameIndex:
+    """Índice por carpeta con el siguiente sufijo libre de cada nombre de archivo"""
+    
+    SUFFIX_PATTERN = re.compile(r'^(.*)_(\d+)$')
+    
     def __init__(self):
+        self.dirs = {}  # carpeta -> {(stem, suffix): [nombre base ocupado, siguiente contador]}
+        self.lock = threading.Lock()
+        self.retries = 0  # nombres que otro proceso ocupó entre la reserva y el movimiento
+    
+    def _entries(self, directory):
+        """Índice de una carpeta; se construye con un único recorrido la primera vez"""
+        entries = self.dirs.get(directory)
+        if entries is None:
+            entries = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        self._register(entries, entry.name)
+            except FileNotFoundError:
+                pass
+            self.dirs[directory] = entries
+        return entries
+    
+    def _register(self, entries, name):
+        """Marcar un nombre como ocupado"""
+        path = Path(name)
+        stem, suffix = path.stem, path.suffix
+        entries.setdefault((stem, suffix), [False, 1])[0] = True
+        
+        # "informe_3.pdf" también ocupa el contador 3 de "informe.pdf"
+        match = self.SUFFIX_PATTERN.match(stem)
+        if match:
+            entry = entries.setdefault((match.group(1), suffix), [False, 1])
+            entry[1] = max(entry[1], int(match.group(2)) + 1)
+    
+    def _reserve(self, directory, file_name):
+        """Proponer el siguiente nombre libre para `file_name` en `directory`"""
+        path = Path(file_name)
+        stem, suffix = path.stem, path.suffix
+        with self.lock:
+            entries = self._entries(directory)
+            entry = entries.setdefault((stem, suffix), [False, 1])
+            if not entry[0]:
+                entry[0] = True
+                return directory / file_name
+            name = f"{stem}_{entry[1]}{suffix}"
+            entry[1] += 1
+            self._register(entries, name)
+            return directory / name
+    
+    def move(self, src_path, directory):
+        """Mover un archivo a `directory` con un nombre único y devolver el destino"""
+        while True:
+            dest_path = self._reserve(directory, src_path.name)
+            try:
+                exclusive_move(src_path, dest_path)
+                return dest_path
+            except FileExistsError:
+                # Lo creó otro proceso: el índice ya avanzó, probar el siguiente
+                with self.lock:
+                    self.retries += 1
+                continue
+
+
+def exclusive_move(src_path, dest_path):
+    """Mover un archivo sin sobrescribir nunca el destino (FileExistsError si existe)"""
+    try:
+        # El enlace duro falla de forma atómica si el destino ya existe
+        os.link(src_path, dest_path, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError):
+        if platform.system() == "Windows":
+            # En Windows rename ya se niega a sobrescribir: no hace falta copiar
+            try:
+                os.rename(src_path, dest_path)
+                return
+            except FileExistsError:
+                raise
+            except OSError:
+                pass  # Otra unidad: solo queda copiar
+        # Sin enlaces duros (otro dispositivo, FAT, ...): reservar el nombre en exclusiva
+        fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        try:
+            shutil.move(str(src_path), str(dest_path))
+        except BaseException:
+            os.unlink(dest_path)
+            raise
+        return
+    try:
+        os.unlink(src_path)
+    except OSError:
+        # Sin borrar el origen se volvería a procesar: deshacer el enlace nuevo
+        try:
+            os.unlink(dest_path)
+        except OSError:
+            pass
+        raise
+
+
+class DuplicateFinder:
+    """Detecta archivos con el mismo contenido dentro de una carpeta de categoría.
+    
+    Solo se comparan archivos del mismo tamaño; entre ellos, primero un hash del
+    principio y el final (64 KiB de cada extremo) y, si coincide, el hash completo
+    leído por bloques. Los hashes se guardan por (dispositivo, inodo) junto con el
+    tamaño y el mtime en un índice persistente, así que un archivo que no cambia
+    no se vuelve a leer.
+    """
+    
+    EDGE_BYTES = 64 * 1024
+    CHUNK_BYTES = 1024 * 1024
+    ACTIONS = ("hardlink", "drop")
+    
+    def __init__(self, index_file, action="hardlink", logger=None):
+        self.index_file = index_file
+        self.action = action if action in self.ACTIONS else "hardlink"
+        self.logger = logger or logging.getLogger(__name__)
+        self.hashes = {}  # "dev:ino" -> {"path", "size", "mtime_ns", "partial", "full"}
+        self.dirs = {}    # carpeta -> {tamaño: {nombres}}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.load()
+    
+    def load(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.hashes = json.load(f)
+        except (OSError, ValueError):
+            self.hashes = {}
+    
+    def save(self):
+        """Guardar el índice descartando los archivos que ya no existen o cambiaron"""
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.hashes)
+            self.dirty = False
+        live = {}
+        for key, entry in entries.items():
+            try:
+                st = os.stat(entry["path"], follow_symlinks=False)
+            except OSError:
+                continue
+            if f"{st.st_dev}:{st.st_ino}" == key and st.st_mtime_ns == entry["mtime_ns"]:
+                live[key] = entry
+        with self.lock:
+            self.hashes = {key: entry for key, entry in self.hashes.items()
+                           if key in live or key not in entries}
+        write_file_atomic(self.index_file, json.dumps(self.hashes))
+    
+    def _sizes(self, directory):
+        """Archivos de la carpeta agrupados por tamaño (se lee una sola vez)"""
+        with self.lock:
+            sizes = self.dirs.get(directory)
+        if sizes is not None:
+            return sizes
+        
+        sizes = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            sizes.setdefault(entry.stat(follow_symlinks=False).st_size,
+                                             set()).add(entry.name)
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            pass
+        with self.lock:
+            return self.dirs.setdefault(directory, sizes)
+    
+    def _digest(self, file_path, kind):
+        """Hash "partial" o "full" del archivo, desde el índice si no cambió"""
+        st = os.stat(file_path, follow_symlinks=False)
+        key = f"{st.st_dev}:{st.st_ino}"
+        with self.lock:
+            entry = self.hashes.get(key)
+            if entry is None or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                entry = {"path": str(file_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                         "partial": None, "full": None}
+            elif entry[kind]:
+                return entry[kind]
+        
+        if kind == "partial":
+            digest = self._hash_edges(file_path, st.st_size)
+            if st.st_size <= 2 * self.EDGE_BYTES:
+                entry["full"] = digest  # Los extremos ya cubren todo el archivo
+        else:
+            digest = self._hash_full(file_path)
+        entry[kind] = digest
+        entry["path"] = str(file_path)
+        with self.lock:
+            self.hashes[key] = entry
+            self.dirty = True
+        return digest
+    
+    def _hash_edges(self, file_path, size):
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            if size <= 2 * self.EDGE_BYTES:
+                hasher.update(f.read())
+            else:
+                hasher.update(f.read(self.EDGE_BYTES))
+                f.seek(-self.EDGE_BYTES, os.SEEK_END)
+                hasher.update(f.read(self.EDGE_BYTES))
+        return hasher.hexdigest()
+    
+    def _hash_full(self, file_path):
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_BYTES)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
+    def find(self, file_path, directory, size):
+        """Ruta de un archivo de `directory` con el mismo contenido, o None"""
+        sizes = self._sizes(directory)
+        with self.lock:
+            candidates = list(sizes.get(size, ()))
+        if not candidates:
+            return None
+        
+        partial = self._digest(file_path, "partial")
+        for name in candidates:
+            candidate = directory / name
+            try:
+                if os.stat(candidate, follow_symlinks=False).st_size != size:
+                    raise FileNotFoundError  # Cambió desde que se leyó la carpeta
+                if (self._digest(candidate, "partial") == partial
+                        and self._digest(candidate, "full") == self._digest(file_path, "full")):
+                    return candidate
+            except OSError:
+                with self.lock:
+                    sizes.get(size, set()).discard(name)
+        return None
+    
+    def add(self, file_path, size):
+        """Registrar un archivo recién llegado a su carpeta"""
+        sizes = self._sizes(file_path.parent)
+        try:
+            st = os.stat(file_path, follow_symlinks=False)
+            key = f"{st.st_dev}:{st.st_ino}"
+        except OSError:
+            key = None
+        with self.lock:
+            sizes.setdefault(size, set()).add(file_path.name)
+            # Si se calculó su hash antes de moverlo, actualizar la ruta del índice
+            entry = self.hashes.get(key)
+            if entry is not None and not Path(entry["path"]).exists():
+                entry["path"] = str(file_path)
+                self.dirty = True
+    
+    def link(self, original, dest_path):
+        """Sustituir `dest_path` por un enlace duro a `original` (operación atómica)"""
+        temp_path = dest_path.with_name(f".{dest_path.name}.dedup")
+        os.link(original, temp_path)
+        try:
+            os.replace(temp_path, dest_path)
+        except OSError:
+            os.unlink(temp_path)
+            raise
+
+
+# Mapeo de extensiones a carpetas por defecto
+DEFAULT_EXTENSION_MAPPING = {
+    # Imágenes
+    '.jpg': 'Imágenes', '.jpeg': 'Imágenes', '.png': 'Imágenes', 
+    '.gif': 'Imágenes', '.bmp': 'Imágenes', '.svg': 'Imágenes',
+    '.webp': 'Imágenes', '.ico': 'Imágenes',
+    
+    # Audio
+    '.mp3': 'Audio', '.wav': 'Audio', '.flac': 'Audio', 
+    '.aac': 'Audio', '.ogg': 'Audio', '.m4a': 'Audio',
+    '.wma': 'Audio',
+    
+    # Video
+    '.mp4': 'Video', '.avi': 'Video', '.mkv': 'Video', 
+    '.mov': 'Video', '.wmv': 'Video', '.flv': 'Video',
+    '.webm': 'Video', '.m4v': 'Video',
+    
+    # Documentos
+    '.pdf': 'Documentos', '.doc': 'Documentos', '.docx': 'Documentos',
+    '.txt': 'Documentos', '.rtf': 'Documentos', '.odt': 'Documentos',
+    '.xls': 'Documentos', '.xlsx': 'Documentos', '.ppt': 'Documentos',
+    '.pptx': 'Documentos', '.ods': 'Documentos', '.odp': 'Documentos',
+    
+    # Comprimidos
+    '.zip': 'Comprimidos', '.rar': 'Comprimidos', '.7z': 'Comprimidos',
+    '.tar': 'Comprimidos', '.gz': 'Comprimidos', '.bz2': 'Comprimidos',
+    '.xz': 'Comprimidos', '.tgz': 'Comprimidos', '.tar.gz': 'Comprimidos',
+    '.tar.bz2': 'Comprimidos', '.tar.xz': 'Comprimidos',
+    
+    # Ejecutables
+    '.exe': 'Ejecutables', '.msi': 'Ejecutables', '.deb': 'Ejecutables',
+    '.rpm': 'Ejecutables', '.dmg': 'Ejecutables', '.pkg': 'Ejecutables',
+    '.elf': 'Ejecutables',
+    
+    # Código
+    '.py': 'Código', '.js': 'Código', '.html': 'Código', '.css': 'Código',
+    '.cpp': 'Código', '.c': 'Código', '.java': 'Código', '.php': 'Código',
+    '.rb': 'Código', '.go': 'Código', '.rs': 'Código',
+}
+
+
+class RuleEngine:
+    """Clasificador de archivos compilado a partir de las reglas de configuración.
+    
+    Las extensiones (también compuestas, como ".tar.gz") se guardan en un trie de
+    sufijos y los patrones de nombre (glob o regex) en una única expresión regular,
+    así que clasificar un archivo cuesta lo mismo con diez reglas que con mil.
+    
+    Cada regla de `rules` es un diccionario con "category" y, opcionalmente,
+    "extensions", "pattern" (glob), "regex", "min_size", "max_size" (bytes) y
+    "mime" (p. ej. "image/*"). Las reglas se aplican en orden y antes que
+    `extension_mapping`; entre extensiones de una misma regla o del mapeo gana
+    la más larga.
+    """
+    
+    def __init__(self, extension_mapping, rules=(), logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.trie = {}             # parte de extensión -> nodo {"children": ..., "rules": ...}
+        self.pattern_rules = []    # reglas con patrón, en el orden de la regex combinada
+        self.separate_rules = []   # reglas con patrón que no se pueden combinar (grupos, flags)
+        self.unconditional = []    # reglas sin extensión ni patrón (solo MIME/tamaño)
+        self.categories = set()
+        
+        compiled = []
+        for index, rule in enumerate(rules):
+            compiled_rule = self._compile_rule(index, rule)
+            if compiled_rule is not None:
+                compiled.append(compiled_rule)
+        
+        # extension_mapping equivale a reglas de solo extensión con menor prioridad
+        offset = len(compiled)
+        for index, (ext, category) in enumerate(extension_mapping.items()):
+            compiled.append({
+                "index": offset + index, "priority": 1, "category": category,
+                "extensions": [ext], "min_size": None, "max_size": None, "mime": None
+            })
+        
+        patterns = []
+        for rule in compiled:
+            self.categories.add(rule["category"])
+            for ext in rule["extensions"]:
+                self._add_extension(ext, rule)
+            if rule.get("regex"):
+                if self._combinable(rule["matcher"]):
+                    patterns.append(f"(?P<r{len(self.pattern_rules)}>(?:{rule['regex']})\\Z)")
+                    self.pattern_rules.append(rule)
+                else:
+                    self.separate_rules.append(rule)
+            if not rule["extensions"] and not rule.get("regex"):
+                self.unconditional.append(rule)
+        
+        self.pattern = None
+        if patterns:
+            try:
+                self.pattern = re.compile("|".join(patterns), re.IGNORECASE)
+            except re.error as e:
+                # No debería pasar tras _combinable; por si acaso, evaluarlas una a una
+                self.logger.warning("No se pudieron combinar las reglas con patrón (%s)", e)
+                self.separate_rules = sorted(self.separate_rules + self.pattern_rules,
+                                             key=lambda rule: rule["index"])
+                self.pattern_rules = []
+    
+    @staticmethod
+    def _combinable(matcher):
+        """Si una regex se puede incrustar en la alternancia combinada.
+        
+        Los grupos con captura (con nombre o referenciados con \\1) cambiarían de
+        número o chocarían con los de otras reglas, y los flags globales como (?i)
+        solo valen al principio de la expresión; esas reglas se evalúan aparte.
+        """
+        if matcher.groups:
+            return False
+        try:
+            re.compile(f"(?P<r0>(?:{matcher.pattern})\\Z)", re.IGNORECASE)
+        except re.error:
+            return False
+        return True
+    
+    def _compile_rule(self, index, rule):
+        """Normalizar una regla de configuración; None si no es válida"""
+        category = rule.get("category")
+        if not category:
+            self.logger.warning("Regla sin categoría ignorada: %s", rule)
+            return None
+        
+        regex = rule.get("regex")
+        if rule.get("pattern"):
+            glob_regex = fnmatch.translate(rule["pattern"])
+            regex = f"{regex}|{glob_regex}" if regex else glob_regex
+        matcher = None
+        if regex:
+            try:
+                matcher = re.compile(regex, re.IGNORECASE)
+            except re.error as e:
+                self.logger.warning("Regla con expresión no válida ignorada (%s): %s", e, rule)
+                return None
+        
+        compiled = {
+            "index": index, "priority": 0, "category": category,
+            "extensions": [ext.lower() for ext in rule.get("extensions", [])],
+            "regex": regex,
+            "matcher": matcher,
+            "min_size": rule.get("min_size"),
+            "max_size": rule.get("max_size"),
+            "mime": rule.get("mime")
+        }
+        if not compiled["extensions"] and not regex and not self._has_conditions(compiled):
+            self.logger.warning("Regla sin condiciones ignorada: %s", rule)
+            return None
+        return compiled
+    
+    def _add_extension(self, ext, rule):
+        """Insertar una extensión en el trie, empezando por su última parte"""
+        parts = ext.lower().lstrip('.').split('.')
+        node = {"children": self.trie}
+        for part in reversed(parts):
+            node = node["children"].setdefault(part, {"children": {}, "rules": []})
+        node["rules"].append((len(parts), rule))
+    
+    @staticmethod
+    def _has_conditions(rule):
+        return rule["min_size"] is not None or rule["max_size"] is not None or bool(rule["mime"])
+    
+    def _candidates(self, name):
+        """Reglas que encajan por nombre, ordenadas por prioridad"""
+        candidates = []
+        
+        # Recorrer las extensiones del nombre de derecha a izquierda por el trie
+        parts = name.lower().split('.')[1:]
+        children = self.trie
+        for part in reversed(parts):
+            node = children.get(part)
+            if node is None:
+                break
+            candidates.extend(node["rules"])
+            children = node["children"]
+        
+        if self.pattern is not None:
+            match = self.pattern.match(name)
+            if match:
+                first = int(match.lastgroup[1:])
+                candidates.append((0, self.pattern_rules[first]))
+                # La regex combinada solo indica la primera regla; si esta tiene
+                # condiciones de tamaño o MIME, las siguientes pueden hacer falta
+                if self._has_conditions(self.pattern_rules[first]):
+                    candidates.extend(
+                        (0, rule) for rule in self.pattern_rules[first + 1:]
+                        if rule["matcher"].fullmatch(name))
+        candidates.extend((0, rule) for rule in self.separate_rules
+                          if rule["matcher"].fullmatch(name))
+        
+        candidates.extend((0, rule) for rule in self.unconditional)
+        # Las reglas de `rules` van en su orden; la longitud de la extensión solo
+        # desempata dentro de una regla y entre las entradas de extension_mapping
+        candidates.sort(key=lambda item: (item[1]["priority"],
+                                          item[1]["index"] if item[1]["priority"] == 0 else 0,
+                                          -item[0], item[1]["index"]))
+        return [rule for _, rule in candidates]
+    
+    def classify(self, file_path, size=None, mime_detector=None, name=None):
+        """Categoría de un archivo, o 'Otros' si ninguna regla encaja.
+        
+        `name` sustituye al nombre real al buscar reglas (p. ej. con la extensión
+        deducida del contenido). `mime_detector(ruta)` da el tipo MIME por contenido;
+        si no lo hay o no lo reconoce, se deduce del nombre.
+        """
+        name = name or file_path.name
+        mime = None
+        for rule in self._candidates(name):
+            if rule["min_size"] is not None or rule["max_size"] is not None:
+                if size is None:
+                    try:
+                        size = file_path.stat().st_size
+                    except OSError:
+                        continue
+                if rule["min_size"] is not None and size < rule["min_size"]:
+                    continue
+                if rule["max_size"] is not None and size > rule["max_size"]:
+                    continue
+            if rule["mime"]:
+                if mime is None:
+                    mime = ((mime_detector(file_path) if mime_detector else None)
+                            or mimetypes.guess_type(name)[0] or "")
+                if not fnmatch.fnmatchcase(mime, rule["mime"]):
+                    continue
+            return rule["category"]
+        return 'Otros'
+
+
+class ContentSniffer:
+    """Deduce la extensión de un archivo a partir de sus primeros bytes.
+    
+    Solo lee la cabecera (`read_bytes`) y compara con una tabla de firmas
+    conocidas. Los resultados se memorizan por (dispositivo, inodo, tamaño, mtime),
+    así que volver a escanear la carpeta no relee cabeceras.
+    """
+    
+    # (desplazamiento, firma, extensión); las más largas primero dentro de cada familia
+    SIGNATURES = [
+        (0, b'\x89PNG\r\n\x1a\n', '.png'),
+        (0, b'\xff\xd8\xff', '.jpg'),
+        (0, b'GIF87a', '.gif'),
+        (0, b'GIF89a', '.gif'),
+        (0, b'RIFF', '.riff'),
+        (0, b'%PDF-', '.pdf'),
+        (0, b'{\\rtf', '.rtf'),
+        (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '.doc'),
+        (0, b'PK\x03\x04', '.zip'),
+        (0, b'\x1a\x45\xdf\xa3', '.mkv'),
+        (4, b'ftyp', '.mp4'),
+        (0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11', '.wmv'),
+        (0, b'FLV\x01', '.flv'),
+        (0, b'ID3', '.mp3'),
+        (0, b'OggS', '.ogg'),
+        (0, b'fLaC', '.flac'),
+        (0, b'\x7fELF', '.elf'),
+        (0, b'MZ', '.exe'),
+        (0, b'!<arch>\ndebian', '.deb'),
+        (0, b'\xed\xab\xee\xdb', '.rpm'),
+        (0, b'\x1f\x8b', '.gz'),
+        (0, b'BZh', '.bz2'),
+        (0, b'\xfd7zXZ\x00', '.xz'),
+        (0, b"7z\xbc\xaf\x27\x1c", '.7z'),
+        (0, b'Rar!\x1a\x07', '.rar'),
+        (257, b'ustar', '.tar'),
+    ]
+    
+    RIFF_KINDS = {b'WEBP': '.webp', b'WAVE': '.wav', b'AVI ': '.avi'}
+    FTYP_KINDS = {b'qt  ': '.mov', b'M4A ': '.m4a', b'M4V ': '.m4v'}
+    
+    def __init__(self, read_bytes=512, cache_size=4096):
+        self.read_bytes = read_bytes
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def sniff(self, file_path, st=None):
+        """Extensión deducida del contenido, o None si no se reconoce"""
+        try:
+            st = st or file_path.stat()
+            if not st.st_ino:
+                # DirEntry.stat() en Windows deja st_dev/st_ino a 0
+                st = file_path.stat()
+        except OSError:
+            return None
+        identity = (st.st_dev, st.st_ino) if st.st_ino else str(file_path)
+        key = (identity, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(self.read_bytes)
+        except OSError:
+            return None
+        ext = self.detect(head)
+        
+        with self.lock:
+            self.cache[key] = ext
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return ext
+    
+    def mime_type(self, file_path, st=None):
+        """Tipo MIME deducido del contenido, o None si no se reconoce"""
+        ext = self.sniff(file_path, st)
+        return mimetypes.guess_type("archivo" + ext)[0] if ext else None
+    
+    def detect(self, head):
+        """Extensión correspondiente a una cabecera, o None"""
+        for offset, magic, ext in self.SIGNATURES:
+            if head.startswith(magic, offset):
+                ext = self._refine(ext, head)
+                if ext:
+                    return ext
+        return None
+    
+    def _refine(self, ext, head):
+        """Afinar firmas compartidas por varios formatos"""
+        if ext == '.riff':
+            return self.RIFF_KINDS.get(head[8:12])
+        if ext == '.mp4':
+            return self.FTYP_KINDS.get(head[8:12], '.mp4')
+        if ext == '.mkv':
+            return '.webm' if b'webm' in head else '.mkv'
+        if ext == '.zip':
+            # Documentos OOXML y OpenDocument también son ZIP
+            if b'mimetypeapplication/vnd.oasis.opendocument.' in head:
+                kind = head.split(b'opendocument.', 1)[1]
+                for prefix, doc_ext in ((b'text', '.odt'), (b'spreadsheet', '.ods'),
+                                        (b'presentation', '.odp')):
+                    if kind.startswith(prefix):
+                        return doc_ext
+            for marker, doc_ext in ((b'word/', '.docx'), (b'xl/', '.xlsx'), (b'ppt/', '.pptx'),
+                                    (b'[Content_Types].xml', '.docx')):
+                if marker in head:
+                    return doc_ext
+            return '.zip'
+        if ext == '.exe':
+            # "MZ" es demasiado corto: comprobar también la cabecera PE
+            if len(head) >= 0x40:
+                pe_offset = int.from_bytes(head[0x3c:0x40], 'little')
+                if head[pe_offset:pe_offset + 4] == b'PE\x00\x00':
+                    return '.exe'
+            return None
+        if ext == '.bz2':
+            return '.bz2' if head[3:4].isdigit() else None
+        return ext
+
+
+# Palabras y extensiones que identifican archivos sensibles que NUNCA deben moverse
+# Palabras completas del nombre (no fragmentos): "keyboard.jpg" no contiene "key"
+DEFAULT_SENSITIVE_KEYWORDS = [
+    'password', 'passwords', 'contraseña', 'contraseñas', 'contrasena', 'contrasenas',
+    'credential', 'credentials', 'secret', 'secrets', 'id_rsa', 'id_ed25519',
+    'keychain', 'wallet'
+]
+
+DEFAULT_SENSITIVE_EXTENSIONS = ['.p12', '.pfx', '.key', '.pem', '.ppk', '.kdbx']
+
+DEFAULT_SENSITIVE_CONTENT_KEYWORDS = ['password', 'contraseña', 'login', 'credential', 'secret']
+
+
+class AhoCorasick:
+    """Autómata de Aho-Corasick: busca todas las palabras clave en una sola pasada"""
+    
+    def __init__(self, keywords):
+        self.goto = [{}]     # estado -> {carácter: estado}
+        self.fail = [0]
+        self.output = [None]  # palabra clave que termina en el estado (o en su enlace de fallo)
+        
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                state = next_state
+            if self.output[state] is None:
+                self.output[state] = keyword
+        
+        # Enlaces de fallo en anchura
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                if self.output[next_state] is None:
+                    self.output[next_state] = self.output[self.fail[next_state]]
+    
+    def search(self, text):
+        """Primera palabra clave encontrada en `text` (en minúsculas), o None"""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+class ContentInspector:
+    """Revisa el contenido de un archivo leyendo como mucho `max_bytes` del principio.
+    
+    Cada tipo de archivo tiene un modo: "header" busca las palabras clave solo en
+    las primeras `header_lines` líneas (p. ej. la cabecera de un CSV) y "window"
+    en toda la ventana leída. El coste por archivo queda acotado sea cual sea su tamaño.
+    """
+    
+    DEFAULT_MODES = {'.csv': 'header', '.env': 'window'}
+    
+    def __init__(self, matcher, max_bytes=65536, header_lines=5, modes=None):
+        self.matcher = matcher
+        self.max_bytes = max_bytes
+        self.header_lines = header_lines
+        self.modes = {key.lower(): mode for key, mode in (modes or self.DEFAULT_MODES).items()}
+    
+    def mode_for(self, file_path):
+        """Modo de inspección para el archivo (por extensión o nombre completo), o None"""
+        return self.modes.get(file_path.suffix.lower()) or self.modes.get(file_path.name.lower())
+    
+    def read_window(self, file_path):
+        """Texto de los primeros `max_bytes` del archivo"""
+        with open(file_path, 'rb') as f:
+            data = f.read(self.max_bytes)
+        text = data.decode('utf-8', errors='ignore')
+        if len(data) == self.max_bytes:
+            # La ventana puede cortar la última línea por la mitad
+            text = text.rpartition('\n')[0] or text
+        return text
+    
+    def inspect(self, file_path):
+        """Palabra clave encontrada en el contenido, o None"""
+        mode = self.mode_for(file_path)
+        if mode is None:
+            return None
+        try:
+            text = self.read_window(file_path)
+        except OSError:
+            return None
+        if mode == 'header':
+            text = '\n'.join(text.split('\n', self.header_lines)[:self.header_lines])
+        return self.matcher.search(text.lower())
+
+
+class SensitiveFilePolicy:
+    """Política que decide si un archivo es sensible y debe quedarse donde está.
+    
+    Los nombres se comparan con un autómata construido una sola vez, de modo que
+    el coste no crece con el número de palabras clave, y el contenido se revisa con
+    un ContentInspector de lectura acotada. Con `whole_words` una palabra clave solo
+    cuenta si aparece como palabra completa del nombre ("id_rsa" encaja en "id_rsa.pub",
+    "key" no encaja en "keyboard.jpg"). Las decisiones se guardan
+    por (dispositivo, inodo, mtime, nombre): el nombre se incluye porque un
+    renombrado no cambia ni el inodo ni el mtime.
+    """
+    
+    WORD_RE = re.compile(r"[^\W_]+")
+    SEPARATORS_RE = re.compile(r"[\s_.\-]+")
+    
+    def __init__(self, keywords=None, extensions=None, content_keywords=None, cache_size=4096,
+                 content_max_bytes=65536, content_modes=None, whole_words=True, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        keywords = keywords if keywords is not None else DEFAULT_SENSITIVE_KEYWORDS
+        self.whole_words = whole_words
+        self.keyword_names = {}  # palabra clave normalizada -> como se configuró
+        if whole_words:
+            # Palabras separadas por un espacio y rodeadas de espacios: el autómata
+            # solo encuentra secuencias de palabras completas
+            for keyword in keywords:
+                if not self.WORD_RE.search(keyword):
+                    continue
+                words = self._words(keyword)
+                # Solo los separadores (espacio, _, -, .) pueden desaparecer al normalizar:
+                # "c++" quedaría en "c" y encajaría con cualquier archivo con la palabra "c"
+                if words.strip() != self.SEPARATORS_RE.sub(" ", keyword.lower()).strip():
+                    self.logger.warning("Palabra clave sensible ignorada (solo se admiten letras, "
+                                        "números y separadores con whole_words): %r", keyword)
+                    continue
+                self.keyword_names[words] = keyword
+            keywords = list(self.keyword_names)
+        self.name_matcher = AhoCorasick(keywords)
+        self.extensions = {ext.lower() for ext in (
+            extensions if extensions is not None else DEFAULT_SENSITIVE_EXTENSIONS)}
+        content_matcher = AhoCorasick(
+            content_keywords if content_keywords is not None else DEFAULT_SENSITIVE_CONTENT_KEYWORDS)
+        self.inspector = ContentInspector(content_matcher, max_bytes=content_max_bytes,
+                                          modes=content_modes)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config, logger=None):
+        """Crear la política desde la sección `sensitive_filter` de la configuración"""
+        return cls(keywords=config.get("keywords"),
+                   extensions=config.get("extensions"),
+                   content_keywords=config.get("content_keywords"),
+                   cache_size=config.get("cache_size", 4096),
+                   content_max_bytes=config.get("content_max_bytes", 65536),
+                   content_modes=config.get("content_modes"),
+                   whole_words=config.get("whole_words", True),
+                   logger=logger)
+    
+    @classmethod
+    def _words(cls, text):
+        return " " + " ".join(cls.WORD_RE.findall(text.lower())) + " "
+    
+    def is_sensitive(self, file_path, st=None):
+        """Motivo por el que el archivo es sensible, o None si se puede organizar"""
+        try:
+            st = st or file_path.stat()
+            key = (st.st_dev, st.st_ino, st.st_mtime_ns, file_path.name)
+        except OSError:
+            key = None
+        
+        if key is not None:
+            with self.lock:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    return self.cache[key]
+        
+        reason = self._evaluate(file_path)
+        
+        if key is not None:
+            with self.lock:
+                self.cache[key] = reason
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return reason
+    
+    def _evaluate(self, file_path):
+        filename = file_path.name.lower()
+        extension = file_path.suffix.lower()
+        
+        # Verificar extensión prohibida
+        if extension in self.extensions:
+            return f"extensión {extension}"
+        
+        # Verificar nombre de archivo con palabras prohibidas
+        keyword = self.name_matcher.search(self._words(filename) if self.whole_words else filename)
+        if keyword:
+            return f"nombre contiene '{self.keyword_names.get(keyword, keyword)}'"
+        
+        # Verificar contenido (p. ej. CSV que puedan contener contraseñas)
+        keyword = self.inspector.inspect(file_path)
+        if keyword:
+            return f"contenido contiene '{keyword}'"
+        
+        return None
+
+
+class WatchRoot:
+    """Carpeta vigilada: dónde llegan los archivos, adónde se mueven y con qué reglas.
+    
+    Los archivos que aparecen en `path` van a `destination`/<categoría>. Las raíces
+    con el mismo `shard` (por defecto, las del mismo dispositivo) comparten hilos
+    de trabajo, así que una unidad de red lenta no frena a las carpetas locales.
+    """
+    
+    def __init__(self, name, path, destination=None, rules=None, shard=None, workers=None):
+        self.name = name
+        self.path = Path(path)
+        self.destination = Path(destination) if destination else self.path
+        self.rules = rules
+        self.workers = workers
+        if shard is None:
+            try:
+                shard = f"dev-{os.stat(self.path).st_dev}"
+            except OSError:
+                shard = str(self.path)
+        self.shard = shard
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que deja el formateo del mensaje al hilo escritor"""
+    
+    def prepare(self, record):
+        return record
+
+
+class DownloadOrganizer:
+    def __init__(self, downloads_dir=None):
         self.config_file = "organizer_config.json"
         self.stats_file = "organizer_stats.json"
+        self.journal_file = "organizer_journal.jsonl"
         self.load_config()
-        self.load_stats()
         self.setup_logging()
+        self.journal = MoveJournal(self.journal_file)
+        self.load_stats()
+        
+        # Determinar carpeta de descargas según el SO (o la indicada)
+        self.downloads_dir = Path(downloads_dir) if downloads_dir else self.get_downloads_folder()
+        
+        # Mapeo de extensiones a carpetas: valores por defecto + organizer_config.json
+        self.extension_mapping = dict(DEFAULT_EXTENSION_MAPPING)
+        self.extension_mapping.update(self.config.get("extension_mapping", {}))
+        self.rules = RuleEngine(self.extension_mapping, self.config.get("rules", []), self.logger)
+        # Carpetas vigiladas: la de descargas más las de `watch_roots`
+        self.load_roots()
+        # Deducir el tipo por contenido cuando la extensión falta o no se reconoce
+        self.sniffer = ContentSniffer() if self.config.get("content_sniffing", True) else None
+        
+        # Política de archivos sensibles (cualquier objeto con is_sensitive(ruta, stat))
+        sensitive_config = self.config.get("sensitive_filter", {})
+        self.file_policy = None
+        if sensitive_config.get("enabled", False):
+            self.file_policy = SensitiveFilePolicy.from_config(sensitive_config, self.logger)
+        
+        self.organized_count = 0
+        self.start_time = datetime.now()
+        self.name_index = NameIndex()
+        
+        # Tiempos por etapa y contadores internos (ver --metrics_port en la configuración)
+        self.metrics = Metrics()
+        self.metrics.gauge("name_retries_total", "Reintentos por nombres ocupados al mover",
+                           lambda: self.name_index.retries, kind="counter")
+        
+        # Detección de duplicados por contenido (desactivada por defecto)
+        dedup_config = self.config.get("dedup", {})
+        self.dedup = None
+        if dedup_config.get("enabled", False):
+            self.dedup = DuplicateFinder(dedup_config.get("index_file", "organizer_hashes.json"),
+                                         dedup_config.get("action", "hardlink"), self.logger)
+        self.scanner = DirectoryScanner(self.config.get("scan_workers", 4))
+        self.folder_stats = FolderStatsCache(self)
+        self.notifier = Notifier(self)
+        
+        # Persistencia de estadísticas en segundo plano
+        self.stats_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stats_version = 0
+        self.pending_records = []
+        self.stats_writer = StatsWriter(self)
+        # Los movimientos recuperados del diario entran en la próxima instantánea
+        self.stats_writer.unsnapshotted = self.replayed_records
+        self.stats_writer.start()
+        atexit.register(self.shutdown)
+        
+    def get_downloads_folder(self):
+        """Obtener la carpeta de descargas según el sistema operativo"""
+        if platform.system() == "Windows":
+            try:
+                import winreg
+                key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
+                                   r"Software\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders")
+                downloads = winreg.QueryValueEx(key, "{374DE290-123F-4565-9164-39C4925E467B}")[0]
+                winreg.CloseKey(key)
+                return Path(downloads)
+            except:
+                return Path.home() / "Downloads"
+        else:
+            return Path.home() / "Downloads"
+    
+    def load_roots(self):
+        """Crear las raíces vigiladas; una entrada con la ruta de descargas la personaliza.
+        
+        Las raíces sin reglas propias comparten el RuleEngine general.
+        """
+        primary = WatchRoot("Descargas", self.downloads_dir, rules=self.rules)
+        roots = {primary.path: primary}
+        for entry in self.config.get("watch_roots", []):
+            if not isinstance(entry, dict) or not entry.get("path"):
+                self.logger.warning("Carpeta vigilada sin ruta ignorada: %s", entry)
+                continue
+            path = Path(entry["path"]).expanduser().absolute()
+            rules = self.rules
+            if "extension_mapping" in entry or "rules" in entry:
+                mapping = dict(self.extension_mapping)
+                mapping.update(entry.get("extension_mapping", {}))
+                rules = RuleEngine(mapping, entry.get("rules", []) + self.config.get("rules", []),
+                                   self.logger)
+            destination = entry.get("destination")
+            if destination:
+                destination = Path(destination).expanduser().absolute()
+            roots[path] = WatchRoot(entry.get("name", path.name), path, destination, rules,
+                                    entry.get("shard"), entry.get("workers"))
+        self.roots = list(roots.values())
+        self.roots_by_path = roots
+        # Carpetas base de destino, sin repetir y en orden
+        self.destinations = list(dict.fromkeys(root.destination for root in self.roots))
+    
+    def root_for(self, file_path):
+        """Raíz vigilada de la que viene un archivo (la de descargas si no es de ninguna)"""
+        return self.roots_by_path.get(file_path.parent, self.roots[0])
+    
+    def load_config(self):
+        """Cargar configuración desde archivo"""
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
+        except:
+            self.config = {
+                "auto_start": True,
+                "minimize_to_tray": True,
+                "show_notifications": True,
+                "log_level": "INFO",
+                "worker_threads": 4,
+                "queue_size": 1000,
+                "settle_initial_delay": 0.25,
+                "settle_max_delay": 8,
+                "stats_flush_interval": 5,
+                "stats_flush_batch": 100,
+                "journal_snapshot_interval": 300,
+                "journal_max_bytes": 4194304,
+                "stats_keep_days": 90,
+                "folder_stats_interval": 10,
+                "scan_workers": 4,
+                "bulk_sweep": True,
+                "notification_backend": "auto",
+                "notification_window": 2,
+                "notification_min_interval": 10,
+                "log_max_bytes": 5242880,
+                "log_backup_count": 3,
+                "file_log_level": "INFO",
+                "file_log_sample": 1,
+                "content_sniffing": True,
+                "poll_min_interval": 0.5,
+                "poll_max_interval": 30,
+                "metrics_port": 0,
+                "profile_dir": "profiles",
+                "profile_interval": 0.01,
+                "profile_snapshot_interval": 60,
+                "watch_roots": []
+            }
+    
+    def save_config(self):
+        """Guardar configuración en archivo"""
+        with open(self.config_file, 'w', encoding='utf-8') as f:
+            json.dump(self.config, f, indent=2, ensure_ascii=False)
+    
+    def load_stats(self):
+        """Cargar la instantánea de estadísticas y aplicar la cola del diario"""
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except (OSError, ValueError):
+            self.stats = {
+                "total_organized": 0,
+                "by_category": {},
+                "by_date": {},
+                "start_date": datetime.now().isoformat()
+            }
+        self.stats.setdefault("by_month", {})
+        
+        # Solo se reproducen los movimientos posteriores a la instantánea. Si el
+        # diario se rotó después de guardarla, todo su contenido es nuevo
+        journal_info = self.stats.get("journal", {})
+        offset = 0
+        if journal_info.get("inode") == self.journal.inode():
+            offset = min(journal_info.get("offset", 0), self.journal.size)
+        
+        self.replayed_records = 0
+        for record in self.journal.read_from(offset):
+            self.apply_record(self.stats, record)
+            self.replayed_records += 1
+        if self.replayed_records:
+            self.logger.info("Recuperados %d movimientos del diario", self.replayed_records)
+    
+    @staticmethod
+    def apply_record(stats, record):
+        """Sumar un movimiento del diario a los agregados"""
+        day = datetime.fromtimestamp(record["ts"]).strftime("%Y-%m-%d")
+        category = record["category"]
+        stats["total_organized"] += 1
+        stats["by_category"][category] = stats["by_category"].get(category, 0) + 1
+        stats["by_date"][day] = stats["by_date"].get(day, 0) + 1
+    
+    def compact_dates(self):
+        """Agrupar por mes los días más antiguos que `stats_keep_days`"""
+        keep_days = self.config.get("stats_keep_days", 90)
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        by_date = self.stats["by_date"]
+        by_month = self.stats["by_month"]
+        for day in [day for day in by_date if day < cutoff]:
+            by_month[day[:7]] = by_month.get(day[:7], 0) + by_date.pop(day)
+    
+    def save_stats(self):
+        """Guardar una instantánea de las estadísticas"""
+        self.flush_stats(snapshot=True)
+    
+    def flush_stats(self, snapshot=False):
+        """Anexar los movimientos pendientes al diario y, si toca, guardar instantánea.
+        
+        Devuelve True si se escribió una instantánea.
+        """
+        max_bytes = self.config.get("journal_max_bytes", 4 * 1024 * 1024)
+        with self.flush_lock:
+            with self.stats_lock:
+                records = self.pending_records
+                self.pending_records = []
+                payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                                  for record in records).encode('utf-8')
+                
+                # La instantánea se toma junto con los registros pendientes para que
+                # el desplazamiento guardado corresponda exactamente a los agregados
+                data = None
+                if snapshot or self.journal.size + len(payload) >= max_bytes:
+                    self.compact_dates()
+                    self.stats["journal"] = {
+                        "inode": self.journal.inode(),
+                        "offset": self.journal.size + len(payload)
+                    }
+                    data = json.dumps(self.stats, indent=2, ensure_ascii=False)
+            
+            if payload:
+                try:
+                    self.journal.append(payload)
+                except OSError:
+                    with self.stats_lock:
+                        self.pending_records[:0] = records
+                    raise
+            
+            if data is None:
+                return False
+            write_file_atomic(self.stats_file, data)
+            
+            # Compactación: la instantánea ya incluye todo el diario, se puede rotar
+            if self.journal.size >= max_bytes:
+                self.journal.rotate()
+                with self.stats_lock:
+                    self.stats["journal"] = {"inode": self.journal.inode(), "offset": 0}
+                    data = json.dumps(self.stats, indent=2, ensure_ascii=False)
+                write_file_atomic(self.stats_file, data)
+            return True
+    
+    def record_move(self, category, source, destination, size, linked=False):
+        """Acumular un movimiento en memoria; el escritor lo anexa al diario.
+        
+        `linked` indica que el archivo quedó como enlace duro a otro de la carpeta.
+        """
+        record = {
+            "ts": time.time(),
+            "src": str(source),
+            "dest": str(destination),
+            "category": category,
+            "size": size
+        }
+        with self.stats_lock:
+            self.organized_count += 1
+            self.stats_version += 1
+            self.apply_record(self.stats, record)
+            self.pending_records.append(record)
+        self.stats_writer.mark_dirty()
+        self.folder_stats.record_move(category, size, Path(destination).parent, linked)
+    
+    def shutdown(self):
+        """Vaciar a disco todo lo pendiente antes de salir"""
+        atexit.unregister(self.shutdown)
+        self.folder_stats.stop()
+        self.notifier.stop()
+        self.scanner.shutdown()
+        self.stats_writer.stop()
+        if self.dedup is not None:
+            self.dedup.save()
+        if self.log_listener is not None:
+            self.log_listener.stop()
+            self.log_listener = None
+    
+    def setup_logging(self):
+        """Configurar sistema de logging.
+        
+        Los hilos solo encolan los registros; un único hilo los formatea y los
+        escribe en consola y en organizer.log (rotado por tamaño).
+        """
+        log_level = getattr(logging, self.config.get("log_level", "INFO"))
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        
+        file_handler = logging.handlers.RotatingFileHandler(
+            'organizer.log', encoding='utf-8',
+            maxBytes=self.config.get("log_max_bytes", 5 * 1024 * 1024),
+            backupCount=self.config.get("log_backup_count", 3))
+        stream_handler = logging.StreamHandler()
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue()
+        self.log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True)
+        self.log_listener.start()
+        # force: un segundo organizador en el mismo proceso sustituye los handlers del anterior
+        logging.basicConfig(level=log_level, handlers=[DeferredQueueHandler(log_queue)], force=True)
+        self.logger = logging.getLogger(__name__)
+        
+        # Las líneas por archivo pueden ir a otro nivel y muestrearse (1 de cada N)
+        self.file_log_level = getattr(logging, self.config.get("file_log_level", "INFO"))
+        self.file_log_sample = max(1, self.config.get("file_log_sample", 1))
+        self.file_log_counter = itertools.count()
+    
+    def log_file_event(self, msg, *args):
+        """Registrar una línea por archivo respetando el nivel y el muestreo configurados"""
+        level = self.file_log_level
+        if self.file_log_sample > 1 and next(self.file_log_counter) % self.file_log_sample:
+            level = min(level, logging.DEBUG)
+        self.logger.log(level, msg, *args)
+    
+    def get_category(self, file_path, size=None, st=None, root=None):
+        """Determinar la categoría de un archivo según las reglas de su raíz"""
+        rules = (root or self.root_for(file_path)).rules
+        # Las reglas "mime" miran el contenido (solo se lee si alguna regla lo necesita)
+        mime_detector = None
+        if self.sniffer is not None:
+            mime_detector = lambda path: self.sniffer.mime_type(path, st)
+        category = rules.classify(file_path, size, mime_detector)
+        if category == 'Otros' and self.sniffer is not None:
+            ext = self.sniffer.sniff(file_path, st)
+            if ext:
+                category = rules.classify(file_path, size, mime_detector, name=file_path.name + ext)
+        return category
+    
+    def organize_file(self, file_path):
+        """Organizar un archivo en su carpeta correspondiente"""
+        metrics = self.metrics
+        root = self.root_for(file_path)
+        try:
+            try:
+                with metrics.timer("stat"):
+                    st = file_path.stat()
+            except OSError:
+                metrics.inc("files_gone")
+                return False
+            size = st.st_size
+            
+            # Verificar si es un archivo sensible
+            if self.file_policy is not None:
+                with metrics.timer("sensitive_check"):
+                    reason = self.file_policy.is_sensitive(file_path, st)
+                if reason:
+                    metrics.inc("sensitive_skipped")
+                    self.logger.warning("Archivo sensible ignorado: %s (%s)", file_path.name, reason)
+                    return False
+            
+            with metrics.timer("classify"):
+                category = self.get_category(file_path, size, st, root)
+            dest_path = self.move_to_category(file_path, category, size, root=root)
+            if dest_path is None:
+                return True  # Duplicado descartado: ya quedó anotado en el log
+            
+            with metrics.timer("log"):
+                self.log_file_event("Archivo organizado: %s -> %s/%s", file_path.name, category, dest_path.name)
+            
+            if self.config.get("show_notifications", True):
+                with metrics.timer("notify"):
+                    self.notifier.notify(category, file_path.name)
+            
+            return True
+            
+        except Exception as e:
+            metrics.inc("errors")
+            self.logger.error("Error organizando archivo %s: %s", file_path, e)
+            return False
+    
+    def move_to_category(self, file_path, category, size, make_dir=True, root=None):
+        """Mover un archivo a su carpeta de categoría y anotar el movimiento.
+        
+        Devuelve la ruta final, o None si se descartó por ser un duplicado.
+        """
+        metrics = self.metrics
+        category_dir = (root or self.root_for(file_path)).destination / category
+        
+        # Crear carpeta si no existe
+        if make_dir:
+            with metrics.timer("mkdir"):
+                category_dir.mkdir(parents=True, exist_ok=True)
+        
+        original = None
+        if self.dedup is not None:
+            try:
+                with metrics.timer("dedup"):
+                    original = self.dedup.find(file_path, category_dir, size)
+            except OSError as e:
+                self.logger.warning("No se pudo comprobar si %s está repetido: %s", file_path.name, e)
+        if original is not None and self.dedup.action == "drop":
+            os.unlink(file_path)
+            metrics.inc("duplicates")
+            self.log_file_event("Duplicado descartado: %s (igual a %s/%s)",
+                                file_path.name, category, original.name)
+            return None
+        
+        # Mover archivo con un nombre único
+        with metrics.timer("move"):
+            dest_path = self.name_index.move(file_path, category_dir)
+        
+        linked = False
+        if original is not None:
+            # Conservar el nombre pero compartir los datos con la copia existente
+            metrics.inc("duplicates")
+            try:
+                self.dedup.link(original, dest_path)
+                linked = True
+                self.log_file_event("Duplicado enlazado: %s/%s -> %s",
+                                    category, dest_path.name, original.name)
+            except OSError as e:
+                self.logger.warning("No se pudo enlazar el duplicado %s: %s", dest_path.name, e)
+        if self.dedup is not None:
+            self.dedup.add(dest_path, size)
+        
+        # Actualizar estadísticas (se guardan en segundo plano)
+        with metrics.timer("record"):
+            self.record_move(category, file_path, dest_path, size, linked)
+        metrics.inc("files_organized")
+        return dest_path
+    
+    def show_notification(self, title, message):
+        """Mostrar notificación del sistema"""
+        try:
+            self.notifier.backend.send(title, message)
+        except Exception:
+            pass  # Silenciosamente fallar si no hay notificaciones
+    
+    def get_folder_size(self, folder_path):
+        """Obtener tamaño total de una carpeta"""
+        try:
+            return self.scan_folder(folder_path)['size_bytes']
+        except OSError:
+            return 0
+    
+    def get_categories(self):
+        """Nombres de todas las carpetas de categoría"""
+        categories = {'Otros'}
+        for rules in {id(root.rules): root.rules for root in self.roots}.values():
+            categories |= rules.categories
+        return categories
+    
+    def scan_folder(self, folder_path, cancel=None, time_budget=None):
+        """Recorrer una carpeta una sola vez: archivos, bytes y mtime de cada subcarpeta"""
+        return self.scanner.scan(folder_path, cancel=cancel, time_budget=time_budget)
+    
+    def scan_category(self, category, cancel=None, time_budget=None):
+        """Recorrer la carpeta de una categoría en cada destino y sumar los resultados"""
+        deadline = time.monotonic() + time_budget if time_budget else None
+        result = None
+        for destination in self.destinations:
+            remaining = max(0.001, deadline - time.monotonic()) if deadline else None
+            try:
+                part = self.scan_folder(destination / category, cancel, remaining)
+            except OSError:
+                continue
+            if result is None:
+                result = part
+            else:
+                result['file_count'] += part['file_count']
+                result['size_bytes'] += part['size_bytes']
+                result['dir_mtimes'].update(part['dir_mtimes'])
+                result['complete'] = result['complete'] and part['complete']
+        if result is None:
+            raise FileNotFoundError(f"No existe la carpeta de categoría {category}")
+        return result
+    
+    def get_folder_stats(self):
+        """Obtener estadísticas de todas las carpetas (desde la caché incremental)"""
+        self.folder_stats.start()
+        return self.folder_stats.snapshot()
+    
+    def get_state_version(self):
+        """Valor que cambia cada vez que cambia algo de lo que devuelve get_state()"""
+        return (self.stats_version, self.folder_stats.version)
+    
+    def get_state(self):
+        """Copia coherente del estado para la interfaz; se puede llamar desde cualquier hilo"""
+        version = self.get_state_version()
+        with self.stats_lock:
+            total_organized = self.stats["total_organized"]
+            organized_count = self.organized_count
+        return {
+            "version": version,
+            "total_organized": total_organized,
+            "organized_count": organized_count,
+            "start_time": self.start_time,
+            "folder_stats": self.get_folder_stats(),
+            "metrics": self.metrics.summary()
+        }
+    
+    def organize_existing_files(self, bulk=None):
+        """Organizar archivos existentes en las carpetas vigiladas; devuelve cuántos se movieron"""
+        if bulk is None:
+            bulk = self.config.get("bulk_sweep", True)
+        
+        organized = 0
+        for root in self.roots:
+            if not root.path.exists():
+                self.logger.warning("La carpeta vigilada no existe: %s", root.path)
+                continue
+            if bulk:
+                organized += self.bulk_sweep(root)
+                continue
+            
+            count = 0
+            for file_path in root.path.iterdir():
+                if file_path.is_file():
+                    if self.organize_file(file_path):
+                        count += 1
+            self.logger.info("Se organizaron %d archivos existentes en %s", count, root.path)
+            organized += count
+        return organized
+    
+    def bulk_sweep(self, root=None):
+        """Organizar de una vez todo lo que hay en una carpeta vigilada (la de descargas por defecto).
+        
+        Un único recorrido con scandir, las carpetas se crean una vez por categoría,
+        los movimientos se reparten entre varios hilos y las estadísticas y el log
+        se escriben una sola vez al final.
+        """
+        root = root or self.roots[0]
+        start = time.monotonic()
+        
+        # Un solo recorrido; las descargas en curso (y el marcador con su nombre final
+        # que crea Firefox junto al .part) se dejan para cuando terminen
+        files = []
+        in_progress = set()
+        with os.scandir(root.path) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                file_path = Path(entry.path)
+                if file_path.suffix.lower() in SettleTracker.PARTIAL_SUFFIXES:
+                    in_progress.add(file_path.stem)
+                    continue
+                files.append((file_path, st))
+        
+        # Agrupar por categoría
+        groups = {}
+        skipped = 0
+        for file_path, st in files:
+            if file_path.name in in_progress:
+                continue
+            size = st.st_size
+            if self.file_policy is not None and self.file_policy.is_sensitive(file_path, st):
+                skipped += 1
+                continue
+            groups.setdefault(self.get_category(file_path, size, st, root), []).append(
+                (file_path, size))
+        
+        for category in groups:
+            (root.destination / category).mkdir(parents=True, exist_ok=True)
+        
+        def move(job):
+            """Categoría del archivo si se movió, "" si era un duplicado descartado, None si falló"""
+            file_path, category, size = job
+            try:
+                if self.move_to_category(file_path, category, size, make_dir=False, root=root) is None:
+                    return ""
+                return category
+            except Exception as e:
+                self.logger.error("Error organizando archivo %s: %s", file_path, e)
+                return None
+        
+        jobs = [(file_path, category, size)
+                for category, files in groups.items()
+                for file_path, size in files]
+        # Las estadísticas se escriben una sola vez al final, no cada `stats_flush_batch` archivos
+        self.stats_writer.hold()
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.get("worker_threads", 4)) as executor:
+                results = list(executor.map(move, jobs))
+        finally:
+            self.stats_writer.release()
+        
+        self.stats_writer.flush()
+        if self.dedup is not None:
+            self.dedup.save()
+        
+        moved = Counter(category for category in results if category)
+        organized = sum(moved.values())
+        dropped = results.count("")
+        
+        elapsed = time.monotonic() - start
+        rate = organized / elapsed if elapsed > 0 else 0
+        summary = ", ".join(f"{count} {category}" for category, count in sorted(moved.items()))
+        self.logger.info("Se organizaron %d archivos existentes de %s en %.2f s (%.0f archivos/s)%s",
+                         organized, root.path, elapsed, rate, ": " + summary if summary else "")
+        if dropped:
+            self.logger.info("Se descartaron %d duplicados", dropped)
+        if skipped:
+            self.logger.warning("Se ignoraron %d archivos sensibles", skipped)
+        
+        if self.config.get("show_notifications", True):
+            for category, count in moved.items():
+                self.notifier.notify(category, count=count)
+        return organized
+
+
+class Notify2Backend:
+    """Notificaciones por D-Bus dentro del propio proceso (paquete notify2)"""
+    
+    def __init__(self):
+        import notify2
+        notify2.init("Organizador de Descargas")
+        self.notify2 = notify2
+    
+    def send(self, title, message):
+        self.notify2.Notification(title, message).show()
+
+
+class NotifySendBackend:
+    """Notificaciones con notify-send, sin pasar por la shell"""
+    
+    def __init__(self):
+        if not shutil.which("notify-send"):
+            raise RuntimeError("notify-send no disponible")
+    
+    def send(self, title, message):
+        subprocess.run(["notify-send", title, message], timeout=5,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class Win10ToastBackend:
+    """Notificaciones de Windows con win10toast"""
+    
+    def __init__(self):
+        import win10toast
+        self.toaster = win10toast.ToastNotifier()
+    
+    def send(self, title, message):
+        self.toaster.show_toast(title, message, duration=3)
+
+
+class NullBackend:
+    """Descarta las notificaciones"""
+    
+    def send(self, title, message):
+        pass
+
+
+NOTIFICATION_BACKENDS = {
+    "notify2": Notify2Backend,
+    "notify-send": NotifySendBackend,
+    "win10toast": Win10ToastBackend,
+    "none": NullBackend,
+}
+
+
+def create_notification_backend(name="auto"):
+    """Crear el backend de notificaciones pedido ("auto" elige el primero disponible)"""
+    if name == "auto":
+        if platform.system() == "Windows":
+            candidates = ["win10toast"]
+        else:
+            candidates = ["notify2", "notify-send"]
+    else:
+        candidates = [name]
+    
+    for candidate in candidates:
+        try:
+            return NOTIFICATION_BACKENDS[candidate]()
+        except Exception:
+            continue
+    return NullBackend()
+
+
+class Notifier:
+    """Agrupa los archivos organizados en una sola notificación y la envía en segundo plano.
+    
+    Los avisos se acumulan durante `notification_window` segundos y nunca se envía
+    más de una notificación cada `notification_min_interval` segundos.
+    """
+    
+    def __init__(self, organizer, backend=None):
+        self.organizer = organizer
+        self.window = organizer.config.get("notification_window", 2)
+        self.min_interval = organizer.config.get("notification_min_interval", 10)
+        self._backend = backend
+        self.pending = {}       # categoría -> número de archivos
+        self.last_name = None   # Nombre del archivo si solo hay uno
+        self.last_sent = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()  # Interrumpe las esperas para salir enseguida
+        self.thread = None
+        self.running = False
+    
+    @property
+    def backend(self):
+        """Backend de notificaciones, creado la primera vez que se usa"""
+        if self._backend is None:
+            self._backend = create_notification_backend(
+                self.organizer.config.get("notification_backend", "auto"))
+        return self._backend
+    
+    def notify(self, category, file_name=None, count=1):
+        """Anotar archivos organizados sin bloquear al llamador"""
+        with self.lock:
+            self.pending[category] = self.pending.get(category, 0) + count
+            self.last_name = file_name
+            if not self.running:
+                self.running = True
+                self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+    
+    def stop(self):
+        """Enviar lo pendiente y detener el hilo"""
+        if self.running:
+            self.running = False
+            self.stop_event.set()
+            self.wakeup.set()
+            self.thread.join(timeout=10)
+    
+    def _take_summary(self):
+        """Construir (título, mensaje) con lo acumulado y vaciarlo"""
+        with self.lock:
+            pending = self.pending
+            last_name = self.last_name
+            self.pending = {}
+            self.last_name = None
+        
+        total = sum(pending.values())
+        if not total:
+            return None
+        if total == 1 and last_name:
+            return f"Archivo organizado: {last_name}", next(iter(pending))
+        
+        message = ", ".join(f"{count} {category}"
+                            for category, count in sorted(pending.items(), key=lambda item: -item[1]))
+        return f"{total} archivos organizados", message
+    
+    def _run(self):
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if not self.running:
+                break
+            
+            # Dejar que se acumulen más avisos y respetar el intervalo mínimo;
+            # al detenerse se deja de esperar y el resumen se envía ya
+            if self.stop_event.wait(self.window):
+                break
+            wait = self.last_sent + self.min_interval - time.monotonic()
+            if wait > 0 and self.stop_event.wait(wait):
+                break
+            self._send()
+        self._send()
+    
+    def _send(self):
+        summary = self._take_summary()
+        if summary is None:
+            return
+        self.last_sent = time.monotonic()
+        self.organizer.show_notification(*summary)
+
+
+class StatsWriter:
+    """Anexa los movimientos al diario en segundo plano y guarda instantáneas periódicas"""
+    
+    def __init__(self, organizer, interval=None, batch_size=None):
+        self.organizer = organizer
+        self.interval = interval or organizer.config.get("stats_flush_interval", 5)
+        self.batch_size = batch_size or organizer.config.get("stats_flush_batch", 100)
+        self.snapshot_interval = organizer.config.get("journal_snapshot_interval", 300)
+        self.dirty = 0
+        self.held = 0  # > 0 mientras un barrido agrupa sus cambios para una sola escritura
+        self.unsnapshotted = 0
+        self.last_snapshot = time.monotonic()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.running = False
+    
+    def start(self):
+        """Iniciar el hilo escritor"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Detener el hilo escritor guardando los cambios pendientes"""
+        if self.running:
+            self.running = False
+            self.wakeup.set()
+            self.thread.join()
+        self.flush(snapshot=True)
+    
+    def mark_dirty(self):
+        """Anotar un cambio; despierta al escritor al alcanzar el tamaño de lote"""
+        with self.lock:
+            self.dirty += 1
+            if self.dirty >= self.batch_size and not self.held:
+                self.wakeup.set()
+    
+    def hold(self):
+        """No escribir hasta release(): el llamador hará un único flush() al terminar"""
+        with self.lock:
+            self.held += 1
+    
+    def release(self):
+        with self.lock:
+            self.held -= 1
+    
+    def flush(self, snapshot=False):
+        """Escribir los cambios pendientes; instantánea si se pide o si ya toca"""
+        with self.lock:
+            pending = self.dirty
+            self.dirty = 0
+            self.unsnapshotted += pending
+            snapshot = self.unsnapshotted > 0 and (
+                snapshot or time.monotonic() - self.last_snapshot >= self.snapshot_interval)
+        if not pending and not snapshot:
+            return
+        try:
+            with self.organizer.metrics.timer("stats_snapshot" if snapshot else "stats_flush"):
+                written = self.organizer.flush_stats(snapshot=snapshot)
+            if written:
+                with self.lock:
+                    self.unsnapshotted = 0
+                    self.last_snapshot = time.monotonic()
+        except Exception as e:
+            with self.lock:
+                self.dirty += pending
+                self.unsnapshotted -= pending
+            self.organizer.logger.error("Error guardando estadísticas: %s", e)
+    
+    def _run(self):
+        while self.running:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if not self.held:
+                self.flush()
+
+
+class FolderStatsCache:
+    """Estadísticas por carpeta de categoría, actualizadas con cada movimiento.
+    
+    Un hilo en segundo plano solo vuelve a recorrer una categoría cuando cambia el
+    mtime de alguna de sus carpetas, así que consultar la caché cuesta O(categorías).
+    """
+    
+    def __init__(self, organizer, interval=None):
+        self.organizer = organizer
+        self.interval = interval or organizer.config.get("folder_stats_interval", 10)
+        self.entries = {}      # categoría -> resultado de scan_folder
+        self.version = 0       # aumenta cada vez que cambian las cifras
+        self.scanning = set()  # categorías que se están recorriendo ahora
+        self.rescan = set()    # categorías que hay que volver a recorrer
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.cancel = threading.Event()
+        self.thread = None
+        self.running = False
+    
+    def start(self):
+        """Iniciar el hilo de refresco si no está en marcha"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name="folder-stats", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Detener el hilo de refresco"""
+        if self.running:
+            self.running = False
+            self.cancel.set()
+            self.wakeup.set()
+            self.thread.join()
+    
+    def snapshot(self):
+        """Copia de las estadísticas actuales con el formato de get_folder_stats"""
+        with self.lock:
+            return {
+                category: {
+                    'file_count': entry['file_count'],
+                    'size_bytes': entry['size_bytes'],
+                    'size_mb': round(entry['size_bytes'] / (1024 * 1024), 2)
+                }
+                for category, entry in self.entries.items()
+            }
+    
+    def record_move(self, category, size, category_dir=None, linked=False):
+        """Sumar un archivo recién movido sin recorrer la carpeta.
+        
+        Un enlace duro a un archivo ya contado no suma nada, igual que al recorrerla.
+        """
+        if category_dir is None:
+            category_dir = self.organizer.downloads_dir / category
+        with self.lock:
+            if category in self.scanning:
+                # El recorrido en curso puede no verlo: repetirlo al terminar
+                self.rescan.add(category)
+                return
+            entry = self.entries.get(category)
+            if entry is None:
+                # Categoría nueva: recorrerla ya en vez de esperar al próximo ciclo
+                self.rescan.add(category)
+                self.wakeup.set()
+                return
+            if category_dir not in entry['dir_mtimes']:
+                # Primera vez en este destino: recorrer la categoría para incluirlo
+                self.rescan.add(category)
+                self.wakeup.set()
+                return
+            if not linked:
+                entry['file_count'] += 1
+                entry['size_bytes'] += size
+                self.version += 1
+            
+            # El cambio de mtime lo causó este movimiento: no hace falta recorrerla
+            try:
+                entry['dir_mtimes'][category_dir] = category_dir.stat().st_mtime_ns
+            except OSError:
+                self.rescan.add(category)
+    
+    def _changed(self, category):
+        """Comprobar si alguna carpeta de la categoría cambió desde el último recorrido"""
+        with self.lock:
+            if category in self.rescan:
+                return True
+            entry = self.entries.get(category)
+            dir_mtimes = dict(entry['dir_mtimes']) if entry else None
+        
+        if dir_mtimes is None:
+            return any((destination / category).is_dir()
+                       for destination in self.organizer.destinations)
+        for folder, mtime in dir_mtimes.items():
+            try:
+                if folder.stat().st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+    
+    def _scan(self, category):
+        with self.lock:
+            self.scanning.add(category)
+            self.rescan.discard(category)
+        try:
+            result = self.organizer.scan_category(category, cancel=self.cancel)
+        except OSError:
+            result = None
+        with self.lock:
+            self.scanning.discard(category)
+            previous = self.entries.get(category)
+            if result is None:
+                self.entries.pop(category, None)
+            elif result['complete']:
+                self.entries[category] = result
+            else:
+                self.rescan.add(category)
+            current = self.entries.get(category)
+            if (previous is None) != (current is None) or (
+                    current is not None and (previous['file_count'], previous['size_bytes'])
+                    != (current['file_count'], current['size_bytes'])):
+                self.version += 1
+    
+    def _run(self):
+        while self.running:
+            for category in self.organizer.get_categories():
+                if not self.running:
+                    break
+                if self._changed(category):
+                    self._scan(category)
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+
+class SettleTracker:
+    """Detecta cuándo termina una descarga a partir de eventos y muestras de (tamaño, mtime)"""
+    
+    READY = "ready"      # Descarga completa, se puede mover
+    WAIT = "wait"        # Volver a comprobar tras el retardo indicado
+    PENDING = "pending"  # Ya hay una comprobación programada para esta ruta
+    PARTIAL = "partial"  # Archivo temporal del navegador, esperar al renombrado final
+    GONE = "gone"        # El archivo ya no existe
+    
+    # Sufijos que usan los navegadores mientras la descarga está en curso
+    PARTIAL_SUFFIXES = {'.part', '.crdownload', '.tmp', '.partial', '.download'}
+    
+    def __init__(self, initial_delay=0.25, max_delay=8):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.entries = {}  # ruta -> estado de la última muestra
+        self.close_events = False
+        self.lock = threading.Lock()
+    
+    def is_partial(self, file_path):
+        """Comprobar si el archivo es una descarga a medias del navegador"""
+        return file_path.suffix.lower() in self.PARTIAL_SUFFIXES
+    
+    def has_partial_sibling(self, file_path):
+        """Comprobar si junto al archivo hay una descarga en curso con su nombre.
         
-        # Determinar carpeta de descargas según el SO
-        self.downloads_dir = self.get_downloads_folder()
+        Firefox crea un marcador vacío con el nombre final y escribe en `<nombre>.part`;
+        el marcador no está listo hasta que el .part lo sustituye.
+        """
+        return any(file_path.with_name(file_path.name + suffix).exists()
+                   for suffix in self.PARTIAL_SUFFIXES)
+    
+    def track(self, file_path):
+        """Empezar a seguir una ruta; devuelve True si no estaba ya en seguimiento"""
+        with self.lock:
+            if file_path in self.entries:
+                return False
+            self.entries[file_path] = self._new_entry()
+            return True
+    
+    def touch(self, file_path):
+        """Registrar actividad de escritura; devuelve True si la ruta no estaba en seguimiento"""
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry is None:
+                self.entries[file_path] = self._new_entry()
+                return True
+            entry["active"] = True
+            entry["writes"] = True
+            entry["closed"] = False
+            return False
+    
+    def mark_closed(self, file_path, from_event=True):
+        """Registrar que el proceso que escribía cerró (o renombró) el archivo"""
+        with self.lock:
+            if from_event:
+                # La plataforma informa de cierres: no hace falta fiarse solo del tamaño
+                self.close_events = True
+            entry = self.entries.setdefault(file_path, self._new_entry())
+            entry["closed"] = True
+    
+    def forget(self, file_path):
+        """Dejar de seguir una ruta"""
+        with self.lock:
+            self.entries.pop(file_path, None)
+    
+    def _new_entry(self):
+        return {"sample": None, "due": 0, "active": False, "writes": False, "closed": False,
+                "delay": self.initial_delay}
+    
+    def check(self, file_path):
+        """Tomar una muestra y devolver (estado, segundos hasta la próxima comprobación)"""
+        if self.is_partial(file_path):
+            self.forget(file_path)
+            return self.PARTIAL, None
         
-        # Mapeo de extensiones a carpetas
-        self.extension_mapping = {
-            # Imágenes
-            '.jpg': 'Imágenes', '.jpeg': 'Imágenes', '.png': 'Imágenes', 
-            '.gif': 'Imágenes', '.bmp': 'Imágenes', '.svg': 'Imágenes',
-            '.webp': 'Imágenes', '.ico': 'Imágenes',
-            
-            # Audio
-            '.mp3': 'Audio', '.wav': 'Audio', '.flac': 'Audio', 
-            '.aac': 'Audio', '.ogg': 'Audio', '.m4a': 'Audio',
-            '.wma': 'Audio',
-            
-            # Video
-            '.mp4': 'Video', '.avi': 'Video', '.mkv': 'Video', 
-            '.mov': 'Video', '.wmv': 'Video', '.flv': 'Video',
-            '.webm': 'Video', '.m4v': 'Video',
+        try:
+            st = file_path.stat()
+        except OSError:
+            self.forget(file_path)
+            return self.GONE, None
+        sample = (st.st_size, st.st_mtime_ns)
+        in_progress = self.has_partial_sibling(file_path)
+        
+        with self.lock:
+            entry = self.entries.setdefault(file_path, self._new_entry())
+            if entry["closed"]:
+                if not in_progress:
+                    del self.entries[file_path]
+                    return self.READY, None
+                # Cerrar el marcador no termina la descarga: esperar al renombrado del .part
+                entry["closed"] = False
             
-            # Documentos
-            '.pdf': 'Documentos', '.doc': 'Documentos', '.docx': 'Documentos',
-            '.txt': 'Documentos', '.rtf': 'Documentos', '.odt': 'Documentos',
-            '.xls': 'Documentos', '.xlsx': 'Documentos', '.ppt': 'Documentos',
-            '.pptx': 'Documentos', '.ods': 'Documentos', '.odp': 'Documentos',
+            # Una comprobación duplicada antes de plazo no cuenta como muestra
+            now = time.monotonic()
+            if now < entry["due"]:
+                return self.PENDING, None
             
-            # Comprimidos
-            '.zip': 'Comprimidos', '.rar': 'Comprimidos', '.7z': 'Comprimidos',
-            '.tar': 'Comprimidos', '.gz': 'Comprimidos', '.bz2': 'Comprimidos',
+            previous = entry["sample"]
+            entry["sample"] = sample
             
-            # Ejecutables
-            '.exe': 'Ejecutables', '.msi': 'Ejecutables', '.deb': 'Ejecutables',
-            '.rpm': 'Ejecutables', '.dmg': 'Ejecutables', '.pkg': 'Ejecutables',
+            # Estable si dos muestras seguidas coinciden sin eventos de escritura entre medias.
+            # Si la plataforma informa de cierres y alguien estaba escribiendo, se espera al
+            # cierre salvo que el archivo lleve quieto el intervalo máximo
+            stable = previous == sample and not entry["active"]
+            entry["active"] = False
+            waiting_close = entry["writes"] and self.close_events and entry["delay"] < self.max_delay
+            if stable and not waiting_close and not in_progress:
+                del self.entries[file_path]
+                return self.READY, None
             
-            # Código
-            '.py': 'Código', '.js': 'Código', '.html': 'Código', '.css': 'Código',
-            '.cpp': 'Código', '.c': 'Código', '.java': 'Código', '.php': 'Código',
-            '.rb': 'Código', '.go': 'Código', '.rs': 'Código',
-        }
-        
-        self.organized_count = 0
-        self.start_time = datetime.now()
+            if previous is not None:
+                # Espaciar las muestras con retroceso exponencial
+                entry["delay"] = min(entry["delay"] * 2, self.max_delay)
+            entry["due"] = now + entry["delay"]
+            return self.WAIT, entry["delay"]
+
+
+class InotifyReader:
+    """Lector mínimo de inotify (Linux) a través de ctypes, sin dependencias externas"""
+    
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+    
+    def __init__(self, fd, libc):
+        self.fd = fd
+        self.libc = libc
+        # Tubería para interrumpir una espera en curso desde otro hilo
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+    
+    @classmethod
+    def open(cls, directory=None):
+        """Abrir inotify (y vigilar `directory` si se indica); None si no está disponible"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+        except (OSError, AttributeError):
+            return None
+        reader = cls(fd, libc)
+        if directory is not None and reader.add_watch(directory) is None:
+            reader.close()
+            return None
+        return reader
+    
+    def add_watch(self, directory):
+        """Vigilar otro directorio con el mismo descriptor; devuelve su identificador o None"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.WATCH_MASK)
+        return wd if wd >= 0 else None
+    
+    def read(self, timeout, coalesce=0.05):
+        """Esperar eventos hasta `timeout` segundos y devolver [(vigilancia, máscara, nombre)].
         
-    def get_downloads_folder(self):
-        """Obtener la carpeta de descargas según el sistema operativo"""
-        if platform.system() == "Windows":
+        Tras el primer evento se sigue leyendo durante `coalesce` segundos para
+        agrupar ráfagas en una sola lectura.
+        """
+        events = []
+        ready = select.select([self.fd, self.wake_r], [], [], timeout)[0]
+        if self.wake_r in ready:
+            self._drain_wakeups()
+            return events  # Los eventos pendientes se leerán en la próxima llamada
+        if not ready:
+            return events
+        deadline = time.monotonic() + coalesce
+        while True:
+            self._drain(events)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                return events
+    
+    def _drain(self, events):
+        while True:
             try:
-                import winreg
-                key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
-                                   r"Software\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders")
-                downloads = winreg.QueryValueEx(key, "{374DE290-123F-4565-9164-39C4925E467B}")[0]
-                winreg.CloseKey(key)
-                return Path(downloads)
-            except:
-                return Path.home() / "Downloads"
-        else:
-            return Path.home() / "Downloads"
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, name))
     
-    def load_config(self):
-        """Cargar configuración desde archivo"""
+    def _drain_wakeups(self):
+        """Vaciar la tubería para que cada interrupt() despierte una sola espera"""
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        except:
-            self.config = {
-                "auto_start": True,
-                "minimize_to_tray": True,
-                "show_notifications": True,
-                "log_level": "INFO"
-            }
-    
-    def save_config(self):
-        """Guardar configuración en archivo"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
+            while os.read(self.wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
     
-    def load_stats(self):
-        """Cargar estadísticas desde archivo"""
+    def interrupt(self):
+        """Despertar una llamada a read() bloqueada en otro hilo"""
         try:
-            with open(self.stats_file, 'r', encoding='utf-8') as f:
-                self.stats = json.load(f)
-        except:
-            self.stats = {
-                "total_organized": 0,
-                "by_category": {},
-                "by_date": {},
-                "start_date": datetime.now().isoformat()
-            }
+            os.write(self.wake_w, b'\0')
+        except OSError:
+            pass
     
-    def save_stats(self):
-        """Guardar estadísticas en archivo"""
-        with open(self.stats_file, 'w', encoding='utf-8') as f:
-            json.dump(self.stats, f, indent=2, ensure_ascii=False)
+    def close(self):
+        if self.fd is not None:
+            for fd in (self.fd, self.wake_r, self.wake_w):
+                os.close(fd)
+            self.fd = None
+
+
+class DirectoryWatcher:
+    """Detecta cambios en un directorio sin watchdog: inotify si existe, si no sondeo.
     
-    def setup_logging(self):
-        """Configurar sistema de logging"""
-        log_level = getattr(logging, self.config.get("log_level", "INFO"))
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('organizer.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+    `wait()` devuelve eventos agrupados por nombre: ("created" | "modified" |
+    "closed" | "moved_in" | "deleted", nombre). El sondeo hace un solo `stat` del
+    directorio mientras su mtime no cambie, y `known` se limpia cuando los
+    archivos desaparecen.
+    """
     
-    def get_category(self, file_path):
-        """Determinar la categoría de un archivo según su extensión"""
-        ext = file_path.suffix.lower()
-        return self.extension_mapping.get(ext, 'Otros')
+    # Una mtime tan reciente puede no reflejar aún todos los cambios del directorio
+    MTIME_GRACE_NS = 2_000_000_000
     
-    def organize_file(self, file_path):
-        """Organizar un archivo en su carpeta correspondiente"""
+    def __init__(self, directory, use_inotify=True, inotify=None):
+        self.directory = Path(directory)
+        # Con `inotify` se comparte el descriptor de otro lector (varias carpetas, un hilo)
+        self.owns_inotify = inotify is None
+        self.wd = None
+        if inotify is not None:
+            self.wd = inotify.add_watch(self.directory)
+            self.inotify = inotify if self.wd is not None else None
+        else:
+            self.inotify = InotifyReader.open(self.directory) if use_inotify else None
+        self.dir_mtime = None
+        self.known = set()
+        self.wakeup = threading.Event()
+        self.rescan()
+    
+    @property
+    def backend(self):
+        return "inotify" if self.inotify is not None else "polling"
+    
+    def _list(self):
+        """Nombres de archivos del directorio y mtime con la que se obtuvieron"""
         try:
-            if not file_path.exists():
-                return False
-            
-            category = self.get_category(file_path)
-            category_dir = self.downloads_dir / category
-            
-            # Crear carpeta si no existe
-            category_dir.mkdir(exist_ok=True)
-            
-            # Generar nombre único si ya existe
-            dest_path = category_dir / file_path.name
-            counter = 1
-            while dest_path.exists():
-                stem = file_path.stem
-                suffix = file_path.suffix
-                dest_path = category_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
-            
-            # Mover archivo
-            shutil.move(str(file_path), str(dest_path))
-            
-            # Actualizar estadísticas
-            self.organized_count += 1
-            self.stats["total_organized"] += 1
-            self.stats["by_category"][category] = self.stats["by_category"].get(category, 0) + 1
-            
-            today = datetime.now().strftime("%Y-%m-%d")
-            self.stats["by_date"][today] = self.stats["by_date"].get(today, 0) + 1
-            
-            self.save_stats()
-            
-            self.logger.info(f"Archivo organizado: {file_path.name} -> {category}/{dest_path.name}")
-            
-            if self.config.get("show_notifications", True):
-                self.show_notification(f"Archivo organizado: {file_path.name}", category)
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Error organizando archivo {file_path}: {e}")
-            return False
+            mtime = os.stat(self.directory).st_mtime_ns
+            with os.scandir(self.directory) as it:
+                names = {entry.name for entry in it if entry.is_file(follow_symlinks=False)}
+        except OSError:
+            return None, set()
+        if time.time_ns() - mtime < self.MTIME_GRACE_NS:
+            mtime = None  # No fiarse del atajo en la próxima vuelta
+        return mtime, names
     
-    def show_notification(self, title, message):
-        """Mostrar notificación del sistema"""
+    def rescan(self):
+        """Releer el directorio y devolver los eventos respecto a lo conocido"""
+        self.dir_mtime, names = self._list()
+        events = [("created", name) for name in names - self.known]
+        events.extend(("deleted", name) for name in self.known - names)
+        self.known = names
+        return events
+    
+    def wait(self, timeout):
+        """Esperar hasta `timeout` segundos y devolver los cambios"""
+        if self.inotify is None:
+            if self.wakeup.wait(timeout):
+                return []
+            return self.poll()
+        return self._coalesce(self.inotify.read(timeout))
+    
+    def poll(self):
+        """Sondeo sin espera: un `stat` del directorio y solo si cambió, releerlo"""
         try:
-            if platform.system() == "Windows":
-                try:
-                    import win10toast
-                    toaster = win10toast.ToastNotifier()
-                    toaster.show_toast(title, message, duration=3)
-                except ImportError:
-                    pass
+            if os.stat(self.directory).st_mtime_ns == self.dir_mtime:
+                return []
+        except OSError:
+            pass
+        return self.rescan()
+    
+    def _coalesce(self, raw_events):
+        """Reducir los eventos de inotify a uno o pocos por nombre"""
+        state = OrderedDict()  # nombre -> eventos pendientes, en orden
+        for _, mask, name in raw_events:
+            if mask & InotifyReader.IN_Q_OVERFLOW:
+                # Se perdieron eventos: recuperar el estado leyendo el directorio
+                return self.rescan()
+            if mask & InotifyReader.IN_ISDIR or not name:
+                continue
+            kinds = state.setdefault(name, [])
+            if mask & (InotifyReader.IN_DELETE | InotifyReader.IN_MOVED_FROM):
+                kinds[:] = ["deleted"]
+            elif mask & InotifyReader.IN_CREATE:
+                kinds[:] = ["created"]
+            elif mask & InotifyReader.IN_MOVED_TO:
+                kinds[:] = ["moved_in"]
             else:
-                # Para Linux, usar notify-send si está disponible
-                os.system(f"notify-send '{title}' '{message}' 2>/dev/null")
-        except:
-            pass  # Silenciosamente fallar si no hay notificaciones
+                kind = "closed" if mask & InotifyReader.IN_CLOSE_WRITE else "modified"
+                if "deleted" in kinds:
+                    kinds.remove("deleted")
+                if kind not in kinds:
+                    kinds.append(kind)
+        
+        events = []
+        for name, kinds in state.items():
+            if kinds == ["deleted"]:
+                if name not in self.known:
+                    continue  # Apareció y desapareció dentro de la misma ráfaga
+                self.known.discard(name)
+            elif name not in self.known:
+                if not (self.directory / name).is_file():
+                    continue
+                self.known.add(name)
+                if kinds[0] not in ("created", "moved_in"):
+                    kinds.insert(0, "created")
+            events.extend((kind, name) for kind in kinds)
+        return events
     
-    def get_folder_size(self, folder_path):
-        """Obtener tamaño total de una carpeta"""
-        try:
-            total_size = 0
-            for file_path in folder_path.rglob('*'):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-            return total_size
-        except:
-            return 0
+    def close(self):
+        self.wakeup.set()
+        if self.inotify is not None and self.owns_inotify:
+            self.inotify.close()
+        self.inotify = None
+
+
+class AdaptiveInterval:
+    """Intervalo de espera que se alarga mientras no hay cambios y se acorta con actividad.
     
-    def get_folder_stats(self):
-        """Obtener estadísticas de todas las carpetas"""
-        stats = {}
-        for category in set(self.extension_mapping.values()) | {'Otros'}:
-            category_dir = self.downloads_dir / category
-            if category_dir.exists():
-                file_count = len(list(category_dir.rglob('*')))
-                size_bytes = self.get_folder_size(category_dir)
-                stats[category] = {
-                    'file_count': file_count,
-                    'size_bytes': size_bytes,
-                    'size_mb': round(size_bytes / (1024 * 1024), 2)
-                }
-        return stats
+    Con la carpeta inactiva se duplica hasta `max_interval`, de modo que un equipo
+    en reposo apenas se despierta; en cuanto aparecen cambios vuelve a `min_interval`.
+    """
     
-    def organize_existing_files(self):
-        """Organizar archivos existentes en la carpeta de descargas"""
-        if not self.downloads_dir.exists():
-            self.logger.warning(f"La carpeta de descargas no existe: {self.downloads_dir}")
-            return
+    def __init__(self, min_interval=0.5, max_interval=30, factor=2):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.interval = min_interval
+    
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("poll_min_interval", 0.5), config.get("poll_max_interval", 30))
+    
+    def update(self, active):
+        """Registrar si hubo actividad en la última espera y devolver el siguiente intervalo"""
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.factor, self.max_interval)
+        return self.interval
+
+
+class OrganizerPipeline:
+    """Cola acotada y pool de hilos que organizan archivos fuera del hilo del observador"""
+    
+    def __init__(self, organizer, workers=None, queue_size=None, shard=None):
+        self.organizer = organizer
+        self.shard = shard
+        self.workers = workers or organizer.config.get("worker_threads", 4)
+        self.queue = queue.Queue(maxsize=queue_size or organizer.config.get("queue_size", 1000))
+        self.tracker = SettleTracker(
+            initial_delay=organizer.config.get("settle_initial_delay", 0.25),
+            max_delay=organizer.config.get("settle_max_delay", 8))
         
-        organized = 0
-        for file_path in self.downloads_dir.iterdir():
-            if file_path.is_file():
-                if self.organize_file(file_path):
-                    organized += 1
+        # Comprobaciones programadas: montículo de (instante, secuencia, ruta)
+        self.delayed = []
+        self.delayed_seq = 0
+        self.delayed_cond = threading.Condition()
         
-        self.logger.info(f"Se organizaron {organized} archivos existentes")
+        # Rutas que no cupieron en la cola; se reencolan cuando hay hueco
+        self.overflow = set()
+        self.overflow_lock = threading.Lock()
+        
+        self.threads = []
+        self.running = False
+        
+        metrics = organizer.metrics
+        labels = {"shard": shard} if shard else None
+        metrics.gauge("queue_depth", "Archivos esperando en la cola de trabajo", self.queue.qsize,
+                      labels=labels)
+        metrics.gauge("queue_overflow", "Archivos que no cupieron en la cola",
+                      lambda: len(self.overflow), labels=labels)
+        metrics.gauge("delayed_checks", "Comprobaciones de descarga programadas",
+                      lambda: len(self.delayed), labels=labels)
+        metrics.gauge("tracked_files", "Descargas en seguimiento",
+                      lambda: len(self.tracker.entries), labels=labels)
+    
+    def start(self):
+        """Iniciar los hilos de trabajo"""
+        self.running = True
+        suffix = f"-{self.shard}" if self.shard else ""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"organizer-worker{suffix}-{i}",
+                                      daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        
+        thread = threading.Thread(target=self._scheduler, name=f"organizer-scheduler{suffix}",
+                                  daemon=True)
+        thread.start()
+        self.threads.append(thread)
+    
+    def stop(self, timeout=5):
+        """Detener los hilos de trabajo"""
+        self.running = False
+        with self.delayed_cond:
+            self.delayed_cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+    
+    def submit(self, file_path):
+        """Encolar un archivo sin bloquear nunca al llamador"""
+        try:
+            self.queue.put_nowait(file_path)
+        except queue.Full:
+            with self.overflow_lock:
+                self.overflow.add(file_path)
+    
+    def submit_later(self, file_path, delay):
+        """Programar una nueva comprobación del archivo dentro de `delay` segundos"""
+        with self.delayed_cond:
+            self.delayed_seq += 1
+            heapq.heappush(self.delayed, (time.monotonic() + delay, self.delayed_seq, file_path))
+            self.delayed_cond.notify()
+    
+    def _scheduler(self):
+        """Reencolar las comprobaciones programadas cuando vence su plazo"""
+        with self.delayed_cond:
+            while self.running:
+                if not self.delayed:
+                    self.delayed_cond.wait()
+                    continue
+                due = self.delayed[0][0] - time.monotonic()
+                if due > 0:
+                    self.delayed_cond.wait(due)
+                    continue
+                _, _, file_path = heapq.heappop(self.delayed)
+                self.submit(file_path)
+    
+    def _drain_overflow(self):
+        """Mover rutas pendientes del desbordamiento a la cola"""
+        with self.overflow_lock:
+            while self.overflow:
+                file_path = self.overflow.pop()
+                try:
+                    self.queue.put_nowait(file_path)
+                except queue.Full:
+                    self.overflow.add(file_path)
+                    break
+    
+    def _worker(self):
+        while self.running:
+            try:
+                file_path = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                self._drain_overflow()
+                continue
+            
+            try:
+                with self.organizer.metrics.timer("settle_check"):
+                    state, delay = self.tracker.check(file_path)
+                if state == SettleTracker.READY:
+                    self.organizer.organize_file(file_path)
+                elif state == SettleTracker.WAIT:
+                    # Sigue creciendo: comprobar de nuevo más tarde sin ocupar el hilo
+                    self.organizer.metrics.inc("settle_waits")
+                    self.submit_later(file_path, delay)
+            finally:
+                self.queue.task_done()
 
 
-class DownloadEventHandler(FileSystemEventHandler):
-    def __init__(self, organizer):
+class PipelineShards:
+    """Un OrganizerPipeline, con su manejador de eventos, por cada `shard` de raíces.
+    
+    Cada shard tiene su propia cola e hilos, así que los archivos de una unidad de
+    red lenta no ocupan los hilos de las carpetas locales; las raíces del mismo
+    shard comparten hilos y añadir carpetas no multiplica los hilos.
+    """
+    
+    def __init__(self, organizer, roots=None):
+        self.organizer = organizer
+        self.pipelines = {}  # shard -> OrganizerPipeline
+        self.handlers = {}   # shard -> DownloadEventHandler
+        roots = organizer.roots if roots is None else roots
+        named = len({root.shard for root in roots}) > 1
+        for root in roots:
+            if root.shard in self.pipelines:
+                continue
+            workers = max((r.workers or 0 for r in roots if r.shard == root.shard),
+                          default=0) or None
+            # Con un solo shard, hilos y métricas se llaman como siempre
+            pipeline = OrganizerPipeline(organizer, workers, shard=root.name if named else None)
+            self.pipelines[root.shard] = pipeline
+            self.handlers[root.shard] = DownloadEventHandler(organizer, pipeline)
+    
+    def handler_for(self, root):
+        return self.handlers[root.shard]
+    
+    def start(self):
+        for pipeline in self.pipelines.values():
+            pipeline.start()
+    
+    def stop(self, timeout=5):
+        for pipeline in self.pipelines.values():
+            pipeline.stop(timeout)
+
+
+class RecentEvents:
+    """Recuerda claves vistas en los últimos `ttl` segundos con memoria acotada.
+    
+    Las claves se guardan en un anillo de cubetas de tiempo: al avanzar el reloj
+    se descartan cubetas enteras, y si se supera `max_entries` se descarta la más
+    antigua antes de tiempo, así que la memoria no crece con el tiempo de servicio.
+    """
+    
+    def __init__(self, ttl=2, buckets=4, max_entries=10000):
+        self.ttl = ttl
+        self.bucket_span = ttl / buckets
+        self.max_entries = max_entries
+        self.ring = deque()  # (inicio de la cubeta, {clave: valor})
+        self.size = 0
+        self.lock = threading.Lock()
+    
+    def _expire(self, now):
+        while self.ring and (self.ring[0][0] + self.bucket_span + self.ttl <= now
+                             or self.size > self.max_entries):
+            _, bucket = self.ring.popleft()
+            self.size -= len(bucket)
+    
+    def seen(self, key, value=None):
+        """True si `key` se vio hace poco con el mismo valor; si no, la registra"""
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            for start, bucket in reversed(self.ring):
+                if key in bucket:
+                    if bucket[key] == value:
+                        return True
+                    break
+            if not self.ring or now >= self.ring[-1][0] + self.bucket_span:
+                self.ring.append((now, {}))
+            bucket = self.ring[-1][1]
+            if key not in bucket:
+                self.size += 1
+            bucket[key] = value
+            return False
+    
+    def __len__(self):
+        return self.size
+
+
+class DownloadEventHandler:
+    """Manejador de eventos compatible con watchdog sin heredar de sus clases.
+    
+    El observador solo llama a dispatch(), así que watchdog no hace falta para
+    importar este módulo.
+    """
+    
+    def __init__(self, organizer, pipeline):
         self.organizer = organizer
-        self.cooldown = {}
-        self.cooldown_time = 2  # Segundos de espera para evitar procesamiento múltiple
+        self.pipeline = pipeline
+        # Envíos recientes por inodo, para ignorar eventos repetidos del mismo archivo
+        self.recent = RecentEvents(ttl=2)
+    
+    def dispatch(self, event):
+        """Repartir un evento al método on_<tipo> correspondiente"""
+        handler = getattr(self, f"on_{event.event_type}", None)
+        if handler is not None:
+            handler(event)
+    
+    def _submit(self, file_path):
+        """Encolar una ruta salvo que este mismo archivo (inodo y nombre) se enviara hace poco.
+        
+        Un renombrado conserva el inodo pero cambia el nombre, así que no cuenta
+        como duplicado.
+        """
+        try:
+            st = file_path.stat()
+            duplicate = self.recent.seen((st.st_dev, st.st_ino), file_path.name)
+        except OSError:
+            duplicate = True  # Ya no existe: no hay nada que procesar
+        if duplicate:
+            self.pipeline.tracker.forget(file_path)
+        else:
+            self.pipeline.submit(file_path)
     
     def on_created(self, event):
         if event.is_directory:
@@ -268,33 +2995,201 @@ class DownloadEventHandler(FileSystemEventHandler):
         
         file_path = Path(event.src_path)
         
-        # Evitar procesamiento múltiple del mismo archivo
-        file_key = str(file_path)
-        current_time = time.time()
+        # Las descargas a medias se procesan cuando el navegador las renombra
+        if self.pipeline.tracker.is_partial(file_path):
+            return
+        
+        # Solo encolar: los hilos de trabajo comprueban que la descarga terminó.
+        # Los eventos repetidos de un archivo en seguimiento no llegan a hacer stat
+        if self.pipeline.tracker.track(file_path):
+            self._submit(file_path)
+    
+    def on_modified(self, event):
+        if event.is_directory:
+            return
+        
+        file_path = Path(event.src_path)
+        if self.pipeline.tracker.is_partial(file_path):
+            return
         
-        if file_key in self.cooldown:
-            if current_time - self.cooldown[file_key] < self.cooldown_time:
-                return
+        # Si no estaba en seguimiento (p. ej. existía antes de iniciar), encolarlo
+        if self.pipeline.tracker.touch(file_path):
+            self._submit(file_path)
+    
+    def on_closed(self, event):
+        if event.is_directory:
+            return
+        
+        file_path = Path(event.src_path)
+        if self.pipeline.tracker.is_partial(file_path):
+            return
+        
+        self.pipeline.tracker.mark_closed(file_path)
+        self.pipeline.submit(file_path)
+    
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+        
+        src_path = Path(event.src_path)
+        dest_path = Path(event.dest_path)
+        self.pipeline.tracker.forget(src_path)
+        
+        # Solo interesa el renombrado final dentro de una carpeta vigilada
+        if dest_path.parent not in self.organizer.roots_by_path:
+            return
+        if self.pipeline.tracker.is_partial(dest_path):
+            return
         
-        self.cooldown[file_key] = current_time
+        # El navegador renombra el archivo temporal cuando ha terminado de escribirlo
+        self.pipeline.tracker.mark_closed(dest_path, from_event=False)
+        self._submit(dest_path)
+    
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.pipeline.tracker.forget(Path(event.src_path))
+
+
+class FallbackMonitor:
+    """Monitoreo sin watchdog: entrega los cambios de DirectoryWatcher al manejador de eventos.
+    
+    Un solo hilo atiende todas las carpetas: las que admiten inotify comparten un
+    descriptor y el resto se sondea con un `stat` por vuelta.
+    """
+    
+    HANDLERS = {"created": "on_created", "modified": "on_modified", "closed": "on_closed",
+                "moved_in": "on_moved", "deleted": "on_deleted"}
+    
+    def __init__(self, organizer, handler=None, schedule=None, use_inotify=True):
+        self.organizer = organizer
+        self.schedule = schedule or AdaptiveInterval.from_config(organizer.config)
+        self.use_inotify = use_inotify
+        self.watches = []   # (directorio, manejador) pendientes de start()
+        self.watchers = []  # (DirectoryWatcher, manejador)
+        self.inotify = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        if handler is not None:
+            self.watch(organizer.downloads_dir, handler)
+    
+    def watch(self, directory, handler):
+        """Añadir una carpeta (como Observer.schedule de watchdog); antes de start()"""
+        self.watches.append((Path(directory), handler))
+    
+    def start(self):
+        """Empezar a vigilar; devuelve el mecanismo usado ("inotify", "polling" o ambos)"""
+        if self.use_inotify:
+            self.inotify = InotifyReader.open()
+        for directory, handler in self.watches:
+            if self.inotify is not None:
+                watcher = DirectoryWatcher(directory, inotify=self.inotify)
+            else:
+                watcher = DirectoryWatcher(directory, use_inotify=False)
+            self.watchers.append((watcher, handler))
+        if self.inotify is not None and not any(w.inotify for w, _ in self.watchers):
+            self.inotify.close()
+            self.inotify = None
+        self.thread = threading.Thread(target=self._run, name="fallback-monitor", daemon=True)
+        self.thread.start()
+        return "+".join(sorted({watcher.backend for watcher, _ in self.watchers})) or "polling"
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.inotify is not None:
+            self.inotify.interrupt()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        for watcher, _ in self.watchers:
+            watcher.close()
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+    
+    def dispatch(self, handler, kind, file_path):
+        """Convertir un cambio en la llamada equivalente del manejador de watchdog"""
+        event = SimpleNamespace(src_path=str(file_path), dest_path=str(file_path), is_directory=False)
+        getattr(handler, self.HANDLERS[kind])(event)
+    
+    def _wait(self, timeout):
+        """Esperar hasta `timeout` segundos y devolver [(vigilante, manejador, tipo, nombre)]"""
+        if self.inotify is not None:
+            raw_events = self.inotify.read(timeout)
+        else:
+            self.stop_event.wait(timeout)
+            raw_events = []
+        if self.stop_event.is_set():
+            return []
         
-        # Pequeña espera para asegurar que la descarga se completó
-        time.sleep(1)
+        # Repartir los eventos de inotify por vigilancia; un desbordamiento afecta a todas
+        by_wd = {}
+        overflow = []
+        for event in raw_events:
+            if event[1] & InotifyReader.IN_Q_OVERFLOW:
+                overflow.append(event)
+            else:
+                by_wd.setdefault(event[0], []).append(event)
         
-        if file_path.exists():
-            self.organizer.organize_file(file_path)
+        changes = []
+        for watcher, handler in self.watchers:
+            if watcher.inotify is None:
+                events = watcher.poll()
+            elif watcher.wd in by_wd or overflow:
+                events = watcher._coalesce(by_wd.get(watcher.wd, []) + overflow)
+            else:
+                continue
+            changes.extend((watcher, handler, kind, name) for kind, name in events)
+        return changes
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                changes = self._wait(self.schedule.interval)
+                for watcher, handler, kind, name in changes:
+                    self.dispatch(handler, kind, watcher.directory / name)
+                # Los archivos nuevos van al pipeline, que comprueba en paralelo si terminaron
+                self.schedule.update(bool(changes))
+            except Exception as e:
+                self.organizer.logger.error("Error en el monitoreo sin watchdog: %s", e)
+                self.stop_event.wait(self.schedule.max_interval)
 
 
 class MonitorGUI:
+    """Ventana de estado. Se ejecuta en el hilo principal y nunca bloquea el bucle de Tk:
+    el trabajo costoso va a un hilo aparte y su resultado vuelve por una cola que se
+    consulta con `after`.
+    """
+    
+    POLL_ACTIVE_MS = 16   # ~60 fps mientras hay tareas en curso
+    POLL_IDLE_MS = 250
+    
     def __init__(self, organizer):
         self.organizer = organizer
+        load_tkinter()
         self.root = tk.Tk()
         self.root.title("Organizador de Descargas - Monitor")
-        self.root.geometry("600x500")
+        self.root.geometry("600x650")
         self.root.resizable(True, True)
         
+        # Resultados que otros hilos entregan al hilo de Tk: (función, argumentos)
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-task")
+        self.tasks_running = 0
+        self.refreshing = False
+        self.refresh_changed = False
+        self.refresh_job = None
+        self.stop_requested = False
+        
+        # Filas del Treeview por categoría, para actualizar solo las que cambian
+        self.tree_items = {}     # categoría -> id del elemento
+        self.tree_values = {}    # categoría -> valores mostrados
+        self.metric_items = {}   # etapa -> id del elemento en el panel de rendimiento
+        self.shown_version = None
+        # Refresco rápido con actividad, hasta 5 s con el organizador en reposo
+        self.refresh_schedule = AdaptiveInterval(0.5, 5)
+        
         self.setup_ui()
         self.update_stats()
+        self.root.after(self.POLL_IDLE_MS, self.poll_results)
         
     def setup_ui(self):
         """Configurar la interfaz gráfica"""
@@ -317,8 +3212,11 @@ class MonitorGUI:
         info_frame = ttk.LabelFrame(main_frame, text="Información General", padding="10")
         info_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
         
+        extra_roots = len(self.organizer.roots) - 1
         self.downloads_path_label = ttk.Label(info_frame, 
-                                              text=f"Carpeta de descargas: {self.organizer.downloads_dir}")
+                                              text=f"Carpeta de descargas: {self.organizer.downloads_dir}"
+                                                   + (f" (+{extra_roots} carpetas vigiladas)"
+                                                      if extra_roots else ""))
         self.downloads_path_label.grid(row=0, column=0, sticky="w")
         
         self.total_organized_label = ttk.Label(info_frame, text="Total organizados: 0")
@@ -352,9 +3250,26 @@ class MonitorGUI:
         stats_frame.columnconfigure(0, weight=1)
         stats_frame.rowconfigure(0, weight=1)
         
+        # Rendimiento: tiempo por etapa al organizar archivos
+        metrics_frame = ttk.LabelFrame(main_frame, text="Rendimiento", padding="10")
+        metrics_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        
+        columns = ('Llamadas', 'Media', 'p99')
+        self.metrics_tree = ttk.Treeview(metrics_frame, columns=columns, height=5)
+        self.metrics_tree.heading('#0', text='Etapa')
+        for column in columns:
+            self.metrics_tree.heading(column, text=column)
+            self.metrics_tree.column(column, width=100)
+        self.metrics_tree.column('#0', width=150)
+        self.metrics_tree.grid(row=0, column=0, sticky="ew")
+        
+        self.counters_label = ttk.Label(metrics_frame, text="")
+        self.counters_label.grid(row=1, column=0, sticky="w", pady=(5, 0))
+        metrics_frame.columnconfigure(0, weight=1)
+        
         # Botones
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        button_frame.grid(row=4, column=0, columnspan=2, pady=(10, 0))
         
         self.refresh_button = ttk.Button(button_frame, text="🔄 Actualizar", 
                                         command=self.update_stats)
@@ -368,37 +3283,127 @@ class MonitorGUI:
                                      command=self.stop_organizer)
         self.stop_button.grid(row=0, column=2)
         
-    def update_stats(self):
-        """Actualizar estadísticas en la GUI"""
-        # Limpiar treeview
-        for item in self.stats_tree.get_children():
-            self.stats_tree.delete(item)
+    def post(self, func, *args):
+        """Pedir que `func(*args)` se ejecute en el hilo de Tk (seguro desde cualquier hilo)"""
+        self.results.put((func, args))
+    
+    def run_task(self, func, callback, done=None):
+        """Ejecutar `func` en segundo plano y pasar su resultado a `callback` en el hilo de Tk.
+        
+        `done()` se llama siempre al final, también si `func` o `callback` fallan.
+        """
+        self.tasks_running += 1
+        future = self.executor.submit(func)
+        future.add_done_callback(lambda f: self.post(self._finish_task, callback, f, done))
+    
+    def _finish_task(self, callback, future, done=None):
+        self.tasks_running -= 1
+        try:
+            try:
+                result = future.result()
+            except Exception as e:
+                self.organizer.logger.error("Error en una tarea de la interfaz: %s", e)
+                return
+            callback(result)
+        finally:
+            if done is not None:
+                done()
+    
+    def poll_results(self):
+        """Aplicar los resultados pendientes y volver a programarse"""
+        try:
+            while True:
+                try:
+                    func, args = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    func(*args)
+                except Exception as e:
+                    self.organizer.logger.error("Error actualizando la interfaz: %s", e)
+        finally:
+            # Sin volver a programarse los resultados dejarían de llegar a Tk
+            delay = self.POLL_ACTIVE_MS if self.tasks_running else self.POLL_IDLE_MS
+            self.root.after(delay, self.poll_results)
+    
+    def update_stats(self, force=True):
+        """Pedir una copia del estado del organizador en segundo plano si cambió algo"""
+        if self.refresh_job is not None:
+            self.root.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        if self.refreshing:
+            return
+        if not force and self.organizer.get_state_version() == self.shown_version:
+            # Nada nuevo: solo avanza el reloj y se espera cada vez más
+            self.update_uptime()
+            self.schedule_refresh(active=False)
+            return
+        self.refreshing = True
+        self.refresh_changed = False
+        self.run_task(self.organizer.get_state, self.show_state, self._refresh_done)
+    
+    def _refresh_done(self):
+        """Fin de un refresco (con éxito o no): permitir el siguiente y programarlo"""
+        self.refreshing = False
+        self.schedule_refresh(active=self.refresh_changed)
+    
+    def schedule_refresh(self, active):
+        delay = self.refresh_schedule.update(active)
+        self.refresh_job = self.root.after(int(delay * 1000), self.update_stats, False)
+    
+    def show_state(self, state):
+        """Actualizar estadísticas en la GUI a partir de una copia del estado"""
+        changed = state["version"] != self.shown_version
+        self.refresh_changed = changed
+        self.shown_version = state["version"]
+        
+        rows = {category: (stats['file_count'], format_size(stats['size_mb']))
+                for category, stats in state["folder_stats"].items()}
         
-        # Obtener estadísticas
-        folder_stats = self.organizer.get_folder_stats()
+        # Quitar las categorías que ya no existen
+        for category in [c for c in self.tree_items if c not in rows]:
+            self.stats_tree.delete(self.tree_items.pop(category))
+            self.tree_values.pop(category, None)
         
-        # Agregar datos al treeview
-        for category, stats in sorted(folder_stats.items()):
-            size_text = f"{stats['size_mb']} MB"
-            if stats['size_mb'] > 1024:
-                size_text = f"{stats['size_mb']/1024:.2f} GB"
-            
-            self.stats_tree.insert('', 'end', text=category, 
-                                   values=(stats['file_count'], size_text))
+        # Insertar las nuevas en su posición y tocar solo las filas que cambiaron
+        for index, category in enumerate(sorted(rows)):
+            values = rows[category]
+            item = self.tree_items.get(category)
+            if item is None:
+                self.tree_items[category] = self.stats_tree.insert('', index, text=category,
+                                                                   values=values)
+            elif self.tree_values.get(category) != values:
+                self.stats_tree.item(item, values=values)
+            self.tree_values[category] = values
+        
+        self.show_metrics(state["metrics"])
         
         # Actualizar etiquetas
         self.total_organized_label.config(
-            text=f"Total organizados: {self.organizer.stats['total_organized']}")
+            text=f"Total organizados: {state['total_organized']}")
+        self.update_uptime()
+    
+    def show_metrics(self, metrics):
+        """Actualizar el panel de rendimiento (solo las filas nuevas o cambiadas)"""
+        for index, (stage, data) in enumerate(sorted(metrics["stages"].items())):
+            values = (data["count"], f"{data['mean_ms']:.2f} ms", f"≤ {data['p99_ms']:g} ms")
+            item = self.metric_items.get(stage)
+            if item is None:
+                self.metric_items[stage] = self.metrics_tree.insert('', index, text=stage, values=values)
+            else:
+                self.metrics_tree.item(item, values=values)
         
-        # Actualizar tiempo de ejecución
+        counters = metrics["counters"]
+        self.counters_label.config(text="   ".join(
+            f"{name}: {value}" for name, value in sorted(counters.items())))
+    
+    def update_uptime(self):
+        """Actualizar tiempo de ejecución"""
         uptime = datetime.now() - self.organizer.start_time
         hours, remainder = divmod(uptime.seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
         self.uptime_label.config(
             text=f"Tiempo en ejecución: {hours:02d}:{minutes:02d}:{seconds:02d}")
-        
-        # Programar próxima actualización
-        self.root.after(5000, self.update_stats)  # Actualizar cada 5 segundos
     
     def minimize_to_tray(self):
         """Minimizar a la bandeja del sistema"""
@@ -410,13 +3415,15 @@ class MonitorGUI:
                 from PIL import Image
                 
                 def show_window(icon, item):
-                    self.root.deiconify()
+                    # pystray llama desde su propio hilo: devolver el control al de Tk
+                    icon.stop()
+                    self.post(self.root.deiconify)
                 
-                # Crear ícono simple
+                # Crear ícono simple; su bucle no debe bloquear el de Tk
                 image = Image.new('RGB', (64, 64), color='blue')
                 icon = pystray.Icon("organizer", image, "Organizador de Descargas", 
                                    menu=pystray.Menu(pystray.MenuItem("Mostrar", show_window)))
-                icon.run()
+                threading.Thread(target=icon.run, name="tray-icon", daemon=True).start()
             except ImportError:
                 self.root.deiconify()
         else:
@@ -426,15 +3433,76 @@ class MonitorGUI:
     def stop_organizer(self):
         """Detener el organizador"""
         if messagebox.askyesno("Confirmar", "¿Desea detener el organizador de descargas?"):
+            self.stop_requested = True
             self.root.quit()
     
     def run(self):
-        """Ejecutar la GUI"""
-        self.root.mainloop()
+        """Ejecutar la GUI en el hilo actual (debe ser el principal)"""
+        def interrupt(signum, frame):
+            # Tk atrapa las excepciones de sus callbacks: Ctrl+C cierra el bucle a mano
+            self.stop_requested = True
+            self.root.quit()
+        
+        previous = {signum: signal.signal(signum, interrupt)
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            self.root.mainloop()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            self.executor.shutdown(wait=False)
+            try:
+                self.root.destroy()
+            except tk.TclError:
+                pass  # La ventana ya se cerró
+
+
+def print_report(organizer, time_budget=None):
+    """Mostrar en consola el tamaño de cada carpeta de categoría"""
+    print(f"📁 Carpeta de descargas: {organizer.downloads_dir}")
+    for destination in organizer.destinations[1:]:
+        print(f"📁 Destino adicional: {destination}")
+    start = time.monotonic()
+    total_files = 0
+    total_bytes = 0
+    for category in sorted(organizer.get_categories()):
+        remaining = None
+        if time_budget:
+            remaining = max(0.001, time_budget - (time.monotonic() - start))
+        try:
+            result = organizer.scan_category(category, time_budget=remaining)
+        except OSError:
+            continue
+        total_files += result['file_count']
+        total_bytes += result['size_bytes']
+        size_text = format_size(round(result['size_bytes'] / (1024 * 1024), 2))
+        partial = "" if result['complete'] else " (parcial)"
+        print(f"   📂 {category}: {result['file_count']} archivos, {size_text}{partial}")
+    
+    size_text = format_size(round(total_bytes / (1024 * 1024), 2))
+    print(f"📊 Total: {total_files} archivos, {size_text} "
+          f"({time.monotonic() - start:.2f} s)")
 
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Organizador de Descargas Automático")
+    parser.add_argument("--report", action="store_true",
+                        help="mostrar el tamaño de cada categoría y salir")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="segundos máximos para el informe de --report")
+    parser.add_argument("--headless", action="store_true",
+                        help="ejecutar como servicio sin ventana (no carga tkinter)")
+    parser.add_argument("--profile", action="store_true",
+                        help="perfilar por muestreo desde el arranque (SIGUSR2 lo activa y desactiva)")
+    args = parser.parse_args()
+    
+    if args.report:
+        organizer = DownloadOrganizer()
+        print_report(organizer, args.time_budget)
+        organizer.shutdown()
+        return
+    
     print("🚀 Iniciando Organizador de Descargas...")
     
     # Verificar dependencias
@@ -444,38 +3512,99 @@ def main():
     # Crear organizador
     organizer = DownloadOrganizer()
     
-    print(f"📁 Monitoreando: {organizer.downloads_dir}")
+    # Solo se vigilan las carpetas que existen (la de descargas siempre)
+    roots = [root for root in organizer.roots
+             if root is organizer.roots[0] or root.path.is_dir()]
+    for root in organizer.roots:
+        if root in roots:
+            print(f"📁 Monitoreando: {root.path}" +
+                  (f" → {root.destination}" if root.destination != root.path else ""))
+        else:
+            print(f"⚠️  La carpeta vigilada no existe: {root.path}")
     
     # Organizar archivos existentes
     organizer.organize_existing_files()
     
-    # Configurar observador de archivos si está disponible
+    # Iniciar los pools de hilos de trabajo (uno por dispositivo o shard)
+    shards = PipelineShards(organizer, roots)
+    shards.start()
+    
+    # Un único observador para todas las carpetas
     observer = None
+    fallback = None
     if WATCHDOG_AVAILABLE:
-        event_handler = DownloadEventHandler(organizer)
+        from watchdog.observers import Observer
         observer = Observer()
-        observer.schedule(event_handler, str(organizer.downloads_dir), recursive=False)
+        for root in roots:
+            observer.schedule(shards.handler_for(root), str(root.path), recursive=False)
         observer.start()
         print("👀 Monitoreo en tiempo real activado")
     else:
-        print("⚠️  Ejecutando sin monitoreo en tiempo real")
+        fallback = FallbackMonitor(organizer)
+        for root in roots:
+            fallback.watch(root.path, shards.handler_for(root))
+        backend = fallback.start()
+        print(f"👀 Monitoreo sin watchdog activado ({backend})")
+    
+    startup_ms = (time.perf_counter() - START_TIME) * 1000
+    print(f"⚡ Arranque en {startup_ms:.0f} ms")
+    organizer.logger.info("Arranque en %.0f ms (%s)", startup_ms,
+                          "sin ventana" if args.headless else "con ventana")
+    
+    # Perfilador por muestreo: --profile lo arranca ya; SIGUSR2 lo activa o desactiva
+    profiler = SamplingProfiler.from_config(organizer.config, organizer.logger)
+    if args.profile:
+        profiler.start()
+        print(f"🔬 Perfilador activado: instantáneas en {profiler.output_dir}")
+    if hasattr(signal, "SIGUSR2"):
+        signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.toggle())
     
-    # Iniciar GUI en un hilo separado
-    def run_gui():
-        gui = MonitorGUI(organizer)
-        gui.run()
+    # Endpoint local de métricas en formato Prometheus
+    metrics_server = None
+    metrics_port = organizer.config.get("metrics_port", 0)
+    if metrics_port:
+        try:
+            metrics_server = MetricsServer(organizer.metrics, metrics_port)
+            metrics_server.start()
+            print(f"📈 Métricas en http://127.0.0.1:{metrics_server.port}/metrics")
+        except OSError as e:
+            metrics_server = None
+            print(f"⚠️  No se pudo abrir el puerto de métricas {metrics_port}: {e}")
+    
+    # systemd detiene el servicio con SIGTERM: salir igual que con Ctrl+C
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, terminate)
     
-    gui_thread = threading.Thread(target=run_gui, daemon=True)
-    gui_thread.start()
+    # La interfaz ocupa el hilo principal; observador, pipeline y escritores siguen en segundo plano
+    gui = None
+    if not args.headless:
+        try:
+            gui = MonitorGUI(organizer)
+        except Exception as e:  # sin tkinter o sin pantalla (TclError)
+            print(f"⚠️  Interfaz gráfica no disponible ({e}); continuando sin ventana")
     
     try:
-        while True:
+        if gui is not None:
+            gui.run()
+        # Cerrar la ventana no detiene el organizador; el botón Detener o Ctrl+C sí
+        while gui is None or not gui.stop_requested:
             time.sleep(1)
     except KeyboardInterrupt:
+        pass
+    finally:
         print("\n🛑 Deteniendo organizador...")
         if observer:
             observer.stop()
             observer.join()
+        if fallback:
+            fallback.stop()
+        if metrics_server:
+            metrics_server.stop()
+        if profiler.running:
+            profiler.stop()
+        shards.stop()
+        organizer.shutdown()
         print("✅ Organizador detenido.")
 
 
@@ -15,6 +15,10 @@ from datetime import datetime
 import platform
 import threading
 
+from concurrent.futures import ThreadPoolExecutor
+
+from download_organizer import NameIndex, SettleTracker, DirectoryWatcher, AdaptiveInterval
+
 class SimpleDownloadOrganizer:
     def __init__(self):
         self.config_file = "organizer_config.json"
@@ -53,6 +57,13 @@ class SimpleDownloadOrganizer:
         self.organized_count = 0
         self.start_time = datetime.now()
         self.running = True
+        self.name_index = NameIndex()
+        self.stats_lock = threading.Lock()
+        
+        # Detector de descargas completas
+        self.tracker = SettleTracker(
+            initial_delay=self.config.get("settle_initial_delay", 0.25),
+            max_delay=self.config.get("settle_max_delay", 8))
         
     def load_config(self):
         try:
@@ -108,27 +119,19 @@ class SimpleDownloadOrganizer:
             # Crear carpeta si no existe
             category_dir.mkdir(exist_ok=True)
             
-            # Generar nombre único si ya existe
-            dest_path = category_dir / file_path.name
-            counter = 1
-            while dest_path.exists():
-                stem = file_path.stem
-                suffix = file_path.suffix
-                dest_path = category_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
-            
-            # Mover archivo
-            shutil.move(str(file_path), str(dest_path))
+            # Mover archivo con un nombre único
+            dest_path = self.name_index.move(file_path, category_dir)
             
-            # Actualizar estadísticas
-            self.organized_count += 1
-            self.stats["total_organized"] += 1
-            self.stats["by_category"][category] = self.stats["by_category"].get(category, 0) + 1
-            
-            today = datetime.now().strftime("%Y-%m-%d")
-            self.stats["by_date"][today] = self.stats["by_date"].get(today, 0) + 1
-            
-            self.save_stats()
+            # Actualizar estadísticas (los archivos se organizan desde varios hilos)
+            with self.stats_lock:
+                self.organized_count += 1
+                self.stats["total_organized"] += 1
+                self.stats["by_category"][category] = self.stats["by_category"].get(category, 0) + 1
+                
+                today = datetime.now().strftime("%Y-%m-%d")
+                self.stats["by_date"][today] = self.stats["by_date"].get(today, 0) + 1
+                
+                self.save_stats()
             
             self.logger.info(f"✅ Archivo organizado: {file_path.name} -> {category}/{dest_path.name}")
             print(f"🎯 [PRUEBA] Archivo organizado: {file_path.name} → {category}/")
@@ -162,33 +165,66 @@ class SimpleDownloadOrganizer:
         print(f"👀 [PRUEBA] Iniciando monitoreo de: {self.downloads_dir}")
         print("🔄 [PRUEBA] Monitoreando nuevos archivos (presiona Ctrl+C para detener)")
         
-        # Lista de archivos ya conocidos
-        known_files = set()
-        if self.downloads_dir.exists():
-            known_files = {f.name for f in self.downloads_dir.iterdir() if f.is_file()}
+        # Cambios del directorio: inotify si está disponible, si no sondeo por mtime.
+        # El vigilante recuerda los archivos presentes y olvida los que se van
+        watcher = DirectoryWatcher(self.downloads_dir)
+        print(f"📡 [PRUEBA] Detección de cambios: {watcher.backend}")
+        
+        # Archivos nuevos esperando a que termine su descarga: nombre -> próxima comprobación
+        pending = {}
+        
+        # Espera adaptativa: larga con la carpeta inactiva, corta en cuanto hay cambios
+        schedule = AdaptiveInterval.from_config(self.config)
+        pool = ThreadPoolExecutor(max_workers=self.config.get("worker_threads", 4))
         
         try:
             while self.running:
-                if self.downloads_dir.exists():
-                    current_files = {f.name for f in self.downloads_dir.iterdir() if f.is_file()}
-                    new_files = current_files - known_files
-                    
-                    for filename in new_files:
-                        file_path = self.downloads_dir / filename
+                wait = schedule.interval
+                if pending:
+                    wait = min(wait, max(0.1, min(pending.values()) - time.monotonic()))
+                
+                events = watcher.wait(wait)
+                for kind, filename in events:
+                    file_path = self.downloads_dir / filename
+                    if kind == "deleted":
+                        pending.pop(filename, None)
+                        self.tracker.forget(file_path)
+                        continue
+                    if self.tracker.is_partial(file_path):
+                        continue
+                    if kind == "created" and filename not in pending:
                         print(f"🆕 [PRUEBA] Nuevo archivo detectado: {filename}")
-                        
-                        # Esperar un momento para asegurar que la descarga se completó
-                        time.sleep(2)
-                        
-                        if file_path.exists():
-                            self.organize_file(file_path)
-                            known_files.add(filename)
+                        self.tracker.track(file_path)
+                    elif kind == "modified":
+                        self.tracker.touch(file_path)
+                    elif kind in ("closed", "moved_in"):
+                        self.tracker.mark_closed(file_path, from_event=(kind == "closed"))
+                    pending.setdefault(filename, 0)
+                schedule.update(bool(events or pending))
                 
-                time.sleep(3)  # Revisar cada 3 segundos
+                # Comprobar en paralelo los archivos cuyo plazo ha vencido
+                now = time.monotonic()
+                due = [filename for filename, when in pending.items() if when <= now]
+                for filename, (state, delay) in zip(due, pool.map(self.settle_file, due)):
+                    if state in (SettleTracker.WAIT, SettleTracker.PENDING):
+                        pending[filename] = now + (delay or 0.1)
+                    else:
+                        del pending[filename]
                 
         except KeyboardInterrupt:
             print("\n🛑 [PRUEBA] Monitoreo detenido por el usuario")
             self.running = False
+        finally:
+            pool.shutdown(wait=True)
+            watcher.close()
+    
+    def settle_file(self, filename):
+        """Comprobar si la descarga terminó y, en ese caso, organizar el archivo"""
+        file_path = self.downloads_dir / filename
+        state, delay = self.tracker.check(file_path)
+        if state == SettleTracker.READY:
+            self.organize_file(file_path)
+        return state, delay
     
     def show_stats(self):
         print(f"\n📊 [PRUEBA] Estadísticas actuales:")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Organizador de Descargas - Pruebas automáticas del motor de reglas
+Uso: python3 -m unittest test_rule_engine  (o pytest)
+"""
+
+import logging
+import unittest
+from pathlib import Path
+
+from download_organizer import RuleEngine, DEFAULT_EXTENSION_MAPPING
+
+logging.disable(logging.CRITICAL)
+
+
+class RuleEngineTest(unittest.TestCase):
+    def classify(self, rules, name, mapping=None, size=1):
+        engine = RuleEngine(DEFAULT_EXTENSION_MAPPING if mapping is None else mapping, rules)
+        return engine.classify(Path(name), size)
+
+    def test_global_flags(self):
+        rules = [{"category": "A", "regex": "(?i)^foo.*"}]
+        self.assertEqual(self.classify(rules, "FOObar.txt"), "A")
+        self.assertEqual(self.classify(rules, "bar.txt"), "Documentos")
+
+    def test_repeated_named_groups(self):
+        rules = [{"category": "A", "regex": r"informe_(?P<y>\d{4})\.pdf"},
+                 {"category": "B", "regex": r"acta_(?P<y>\d{4})\.pdf"}]
+        self.assertEqual(self.classify(rules, "informe_2024.pdf"), "A")
+        self.assertEqual(self.classify(rules, "acta_2023.pdf"), "B")
+
+    def test_backreference(self):
+        rules = [{"category": "Eco", "regex": r"(ab)\1.*"},
+                 {"category": "Otra", "pattern": "*.bin"}]
+        self.assertEqual(self.classify(rules, "abab.bin"), "Eco")
+        self.assertEqual(self.classify(rules, "abxx.bin"), "Otra")
+
+    def test_invalid_rule_is_skipped(self):
+        rules = [{"category": "Mala", "regex": "(sin cerrar"},
+                 {"category": "Facturas", "pattern": "factura*"}]
+        self.assertEqual(self.classify(rules, "factura1.pdf"), "Facturas")
+
+    def test_rules_apply_in_order(self):
+        rules = [{"pattern": "factura*", "category": "Facturas"},
+                 {"extensions": [".pdf"], "category": "PDFs"}]
+        self.assertEqual(self.classify(rules, "factura1.pdf"), "Facturas")
+        self.assertEqual(self.classify(rules, "otro.pdf"), "PDFs")
+
+    def test_separate_rule_keeps_its_position(self):
+        rules = [{"category": "Primera", "regex": r"(a)\1\.txt"},
+                 {"category": "Segunda", "pattern": "*.txt"}]
+        self.assertEqual(self.classify(rules, "aa.txt"), "Primera")
+        rules.reverse()
+        self.assertEqual(self.classify(rules, "aa.txt"), "Segunda")
+
+    def test_longest_extension_wins(self):
+        self.assertEqual(self.classify([], "a.tar.gz", {".gz": "GZ", ".tar.gz": "TGZ"}), "TGZ")
+
+
+if __name__ == "__main__":
+    unittest.main()